@@ -0,0 +1,237 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+# Configurare cache răspunsuri AI
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", 1000))
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", 6 * 3600))
+# Nivelul pe disc este opțional - se activează doar dacă avem o cale
+AI_CACHE_DISK_PATH = os.getenv("AI_CACHE_DISK_PATH", "")
+
+# Marcaj folosit în locul numelui oaspetelui în răspunsurile salvate,
+# astfel încât același răspuns să poată fi servit oricărui oaspete
+GUEST_NAME_PLACEHOLDER = "{{guest_name}}"
+# Numele mai scurte (ex: "Al", "Ed") apar prea des în alte cuvinte/contexte: nu le înlocuim
+GUEST_NAME_MIN_CHARS = 3
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """
+    Normalizează textul mesajului pentru a fi folosit drept cheie de cache:
+    litere mici, fără diacritice, fără punctuație și spații multiple.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION_RE.sub(" ", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def make_cache_key(message: str, language: str, hotel_id: Optional[int]) -> str:
+    return f"{hotel_id if hotel_id is not None else '*'}|{language}|{normalize_message(message)}"
+
+
+def _name_pattern(name: str):
+    # Doar apariția numelui ca întreg cuvânt ("Ana", nu "Banana"); \b nu merge pentru nume terminate în punct etc.
+    return re.compile(r"(?<!\w)" + re.escape(name) + r"(?!\w)")
+
+
+def depersonalize(response: str, guest_name: str, reserved_text: str = "") -> Optional[str]:
+    """
+    Înlocuiește numele oaspetelui din răspuns cu GUEST_NAME_PLACEHOLDER.
+    Returnează None dacă răspunsul nu poate fi refolosit în siguranță pentru alt oaspete:
+    nume prea scurt ori nume care apare și în `reserved_text` (promptul de sistem,
+    ex: asistenta se numește tot "Ana").
+    """
+    guest_name = (guest_name or "").strip()
+    if GUEST_NAME_PLACEHOLDER in response:
+        return None
+    if not guest_name:
+        return response
+    if len(guest_name) < GUEST_NAME_MIN_CHARS:
+        return None
+    pattern = _name_pattern(guest_name)
+    if reserved_text and pattern.search(reserved_text):
+        return None
+    return pattern.sub(lambda match: GUEST_NAME_PLACEHOLDER, response)
+
+
+def personalize(template: str, guest_name: str) -> str:
+    return template.replace(GUEST_NAME_PLACEHOLDER, guest_name or "")
+
+
+def _key_hotel(key: str) -> str:
+    return key.split("|", 1)[0]
+
+
+class _DiskTier:
+    """Nivel persistent (SQLite) pentru cache, supraviețuiește repornirilor."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS ai_cache (
+            key TEXT PRIMARY KEY,
+            hotel TEXT,
+            response TEXT,
+            latency REAL,
+            created_at REAL
+        )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_cache_hotel ON ai_cache (hotel)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency, created_at FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def set(self, key: str, response: str, latency: float, created_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, hotel, response, latency, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, _key_hotel(key), response, latency, created_at)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def delete_hotel(self, hotel: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_cache WHERE hotel = ?", (hotel,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_cache")
+            self._conn.commit()
+
+
+class AIResponseCache:
+    """
+    Cache LRU + TTL pentru răspunsurile AI, cu nivel opțional pe disc.
+    Cheia este formată din hotel, limba detectată și textul normalizat.
+    """
+
+    def __init__(self, max_entries: int = AI_CACHE_MAX_ENTRIES, ttl_seconds: int = AI_CACHE_TTL_SECONDS,
+                 disk_path: str = AI_CACHE_DISK_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (response, latency, created_at)
+        self._lock = threading.Lock()
+        self._disk = _DiskTier(disk_path) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def get(self, message: str, language: str, hotel_id: Optional[int] = None,
+            guest_name: str = "") -> Optional[str]:
+        """Returnează răspunsul salvat (cu numele oaspetelui completat) sau None."""
+        key = make_cache_key(message, language, hotel_id)
+        entry = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._expired(entry[2]):
+                del self._entries[key]
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+
+        from_disk = False
+        if entry is None and self._disk is not None:
+            row = self._disk.get(key)
+            if row and not self._expired(row[2]):
+                entry = (row[0], row[1], row[2])
+                from_disk = True
+                self._store(key, entry)
+            elif row:
+                self._disk.delete(key)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if from_disk:
+                self.disk_hits += 1
+            self.saved_latency += entry[1]
+
+        logging.info(f"[AI-CACHE] Hit pentru cheia '{key}'")
+        return personalize(entry[0], guest_name)
+
+    def set(self, message: str, language: str, response: str, hotel_id: Optional[int] = None,
+            guest_name: str = "", latency: float = 0.0, reserved_text: str = ""):
+        """
+        Salvează un răspuns generat; numele oaspetelui este înlocuit cu un marcaj.
+        Nu se salvează dacă numele nu poate fi înlocuit în siguranță (vezi depersonalize).
+        """
+        if not response:
+            return
+        response = depersonalize(response, guest_name, reserved_text)
+        if response is None:
+            logging.info("[AI-CACHE] Răspuns nesalvat: numele oaspetelui nu poate fi înlocuit în siguranță")
+            return
+        key = make_cache_key(message, language, hotel_id)
+        entry = (response, latency, time.time())
+        self._store(key, entry)
+        if self._disk is not None:
+            self._disk.set(key, *entry)
+
+    def _store(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_hotel(self, hotel_id: Optional[int]):
+        """Șterge toate răspunsurile salvate pentru un hotel (ex: la modificarea setărilor)."""
+        hotel = str(hotel_id) if hotel_id is not None else "*"
+        with self._lock:
+            for key in [k for k in self._entries if _key_hotel(k) == hotel]:
+                del self._entries[key]
+        if self._disk is not None:
+            self._disk.delete_hotel(hotel)
+        logging.info(f"[AI-CACHE] Invalidare cache pentru hotelul {hotel}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+        logging.info("[AI-CACHE] Cache golit")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": self._disk is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_latency_seconds": round(self.saved_latency, 3),
+            }
+
+
+ai_response_cache = AIResponseCache()
@@ -0,0 +1,55 @@
+"""add ai_usage
+
+Revision ID: 216742ca37e1
+Revises: 9a107145a887
+Create Date: 2026-10-19 17:23:12.350718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '216742ca37e1'
+down_revision: Union[str, None] = '9a107145a887'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bazele pornite înainte de această migrare au tabelul creat deja de create_all (init_db)
+    if sa.inspect(op.get_bind()).has_table('ai_usage'):
+        return
+    op.create_table('ai_usage',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('message_id', sa.Integer(), nullable=True),
+    sa.Column('hotel_id', sa.Integer(), nullable=True),
+    sa.Column('language', sa.String(), nullable=True),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('total_tokens', sa.Integer(), nullable=True),
+    sa.Column('prompt_chars', sa.Integer(), nullable=True),
+    sa.Column('latency_ms', sa.Integer(), nullable=True),
+    sa.Column('estimated', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['hotel_id'], ['hotels.id'], ),
+    sa.ForeignKeyConstraint(['message_id'], ['messages_sent.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('message_id')
+    )
+    op.create_index(op.f('ix_ai_usage_id'), 'ai_usage', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_usage_hotel_id'), 'ai_usage', ['hotel_id'], unique=False)
+    op.create_index(op.f('ix_ai_usage_language'), 'ai_usage', ['language'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ai_usage_language'), table_name='ai_usage')
+    op.drop_index(op.f('ix_ai_usage_hotel_id'), table_name='ai_usage')
+    op.drop_index(op.f('ix_ai_usage_id'), table_name='ai_usage')
+    op.drop_table('ai_usage')
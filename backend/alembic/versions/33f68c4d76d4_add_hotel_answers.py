@@ -0,0 +1,44 @@
+"""add hotel_answers
+
+Revision ID: 33f68c4d76d4
+Revises: c3a8f41e6b90
+Create Date: 2026-10-19 17:20:04.118263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '33f68c4d76d4'
+down_revision: Union[str, None] = 'c3a8f41e6b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bazele pornite înainte de această migrare au tabelul creat deja de create_all (init_db)
+    if sa.inspect(op.get_bind()).has_table('hotel_answers'):
+        return
+    op.create_table('hotel_answers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.Integer(), nullable=False),
+    sa.Column('intent', sa.String(), nullable=False),
+    sa.Column('language', sa.String(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['hotel_id'], ['hotels.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hotel_id', 'intent', 'language', name='uq_hotel_answers_intent_language')
+    )
+    op.create_index(op.f('ix_hotel_answers_id'), 'hotel_answers', ['id'], unique=False)
+    op.create_index(op.f('ix_hotel_answers_hotel_id'), 'hotel_answers', ['hotel_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_hotel_answers_hotel_id'), table_name='hotel_answers')
+    op.drop_index(op.f('ix_hotel_answers_id'), table_name='hotel_answers')
+    op.drop_table('hotel_answers')
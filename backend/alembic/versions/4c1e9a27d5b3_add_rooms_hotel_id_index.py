@@ -0,0 +1,29 @@
+"""add index on rooms.hotel_id
+
+Revision ID: 4c1e9a27d5b3
+Revises: b72897f6e57f
+Create Date: 2026-10-19 11:02:17.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e9a27d5b3'
+down_revision: Union[str, None] = 'b72897f6e57f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Camerele unei pagini de hoteluri se încarcă cu rooms.hotel_id IN (...)
+    op.create_index(op.f('ix_rooms_hotel_id'), 'rooms', ['hotel_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_rooms_hotel_id'), table_name='rooms')
@@ -0,0 +1,43 @@
+"""add hotel_documents
+
+Revision ID: 9a107145a887
+Revises: 33f68c4d76d4
+Create Date: 2026-10-19 17:21:37.604915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a107145a887'
+down_revision: Union[str, None] = '33f68c4d76d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bazele pornite înainte de această migrare au tabelul creat deja de create_all (init_db)
+    if sa.inspect(op.get_bind()).has_table('hotel_documents'):
+        return
+    op.create_table('hotel_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('uploaded_at', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['hotel_id'], ['hotels.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_hotel_documents_id'), 'hotel_documents', ['id'], unique=False)
+    op.create_index(op.f('ix_hotel_documents_hotel_id'), 'hotel_documents', ['hotel_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_hotel_documents_hotel_id'), table_name='hotel_documents')
+    op.drop_index(op.f('ix_hotel_documents_id'), table_name='hotel_documents')
+    op.drop_table('hotel_documents')
@@ -0,0 +1,50 @@
+"""add hotels.retention_months and messages_sent_archive
+
+Revision ID: 9e5d3b71c2a8
+Revises: 4c1e9a27d5b3
+Create Date: 2026-10-19 14:26:05.318472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e5d3b71c2a8'
+down_revision: Union[str, None] = '4c1e9a27d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('hotels', sa.Column('retention_months', sa.Integer(), nullable=True))
+
+    # Pe PostgreSQL arhiva este partiționată pe luni (partițiile se creează la arhivare,
+    # vezi message_retention.ensure_partitions); pe celelalte baze este un tabel obișnuit
+    op.create_table('messages_sent_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=False),
+    sa.Column('hotel_id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('sent_date', sa.String(), nullable=False),
+    sa.Column('template_name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'sent_at'),
+    postgresql_partition_by='RANGE (sent_at)'
+    )
+    op.create_index('ix_messages_sent_archive_hotel_id_sent_at', 'messages_sent_archive', ['hotel_id', 'sent_at'], unique=False)
+    op.create_index('ix_messages_sent_archive_room_id_sent_at', 'messages_sent_archive', ['room_id', 'sent_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_sent_archive_room_id_sent_at', table_name='messages_sent_archive')
+    op.drop_index('ix_messages_sent_archive_hotel_id_sent_at', table_name='messages_sent_archive')
+    op.drop_table('messages_sent_archive')
+    with op.batch_alter_table('hotels') as batch_op:
+        batch_op.drop_column('retention_months')
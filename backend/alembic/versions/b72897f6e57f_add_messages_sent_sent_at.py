@@ -0,0 +1,50 @@
+"""add messages_sent.sent_at and composite indexes
+
+Revision ID: b72897f6e57f
+Revises: 341f7d4a88df
+Create Date: 2026-10-19 09:12:44.118301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b72897f6e57f'
+down_revision: Union[str, None] = '341f7d4a88df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages_sent', sa.Column('sent_at', sa.DateTime(), nullable=True))
+
+    # Completează sent_at din vechiul șir sent_date ('YYYY-MM-DD', ora 00:00)
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLAlchemy salvează DateTime în SQLite ca text 'YYYY-MM-DD HH:MM:SS.ffffff'
+        op.execute(
+            "UPDATE messages_sent SET sent_at = substr(sent_date, 1, 10) || ' 00:00:00.000000' "
+            "WHERE sent_at IS NULL AND sent_date IS NOT NULL"
+        )
+    else:
+        op.execute(
+            "UPDATE messages_sent SET sent_at = CAST(substr(sent_date, 1, 10) AS DATE) "
+            "WHERE sent_at IS NULL AND sent_date IS NOT NULL"
+        )
+    op.execute("UPDATE messages_sent SET sent_at = CURRENT_TIMESTAMP WHERE sent_at IS NULL")
+
+    with op.batch_alter_table('messages_sent') as batch_op:
+        batch_op.alter_column('sent_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_messages_sent_hotel_id_sent_at', 'messages_sent', ['hotel_id', 'sent_at'], unique=False)
+    op.create_index('ix_messages_sent_room_id_sent_at', 'messages_sent', ['room_id', 'sent_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_sent_room_id_sent_at', table_name='messages_sent')
+    op.drop_index('ix_messages_sent_hotel_id_sent_at', table_name='messages_sent')
+    with op.batch_alter_table('messages_sent') as batch_op:
+        batch_op.drop_column('sent_at')
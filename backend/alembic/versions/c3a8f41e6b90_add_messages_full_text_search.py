@@ -0,0 +1,68 @@
+"""add full-text search index on messages_sent.content
+
+Revision ID: c3a8f41e6b90
+Revises: 9e5d3b71c2a8
+Create Date: 2026-10-19 16:48:31.902157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8f41e6b90'
+down_revision: Union[str, None] = '9e5d3b71c2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Tabel FTS5 cu conținut extern + trigger-e care îl țin la zi (vezi message_search.py)
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_sent_fts USING fts5("
+            "content, content='messages_sent', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS messages_sent_fts_insert AFTER INSERT ON messages_sent BEGIN "
+            "INSERT INTO messages_sent_fts(rowid, content) VALUES (new.id, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS messages_sent_fts_delete AFTER DELETE ON messages_sent BEGIN "
+            "INSERT INTO messages_sent_fts(messages_sent_fts, rowid, content) VALUES ('delete', old.id, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS messages_sent_fts_update AFTER UPDATE OF content ON messages_sent BEGIN "
+            "INSERT INTO messages_sent_fts(messages_sent_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+            "INSERT INTO messages_sent_fts(rowid, content) VALUES (new.id, new.content); END"
+        )
+        op.execute("INSERT INTO messages_sent_fts(messages_sent_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        # Coloană generată (PostgreSQL 12+), deci scorul nu recalculează to_tsvector la fiecare căutare.
+        # Adăugarea rescrie tabelul - de rulat după arhivarea mesajelor vechi (message_retention.py)
+        op.execute(
+            "ALTER TABLE messages_sent ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+        )
+        # CONCURRENTLY: scrierile în messages_sent nu sunt blocate cât se construiește indexul
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_sent_content_tsv ON messages_sent "
+                "USING gin (content_tsv)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('messages_sent_fts_update', 'messages_sent_fts_delete', 'messages_sent_fts_insert'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS messages_sent_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_messages_sent_content_tsv")
+        op.execute("ALTER TABLE messages_sent DROP COLUMN IF EXISTS content_tsv")
@@ -0,0 +1,50 @@
+"""add message_daily_rollup
+
+Revision ID: e650351b5122
+Revises: c127d7660bae
+Create Date: 2026-10-19 17:26:20.473586
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e650351b5122'
+down_revision: Union[str, None] = 'c127d7660bae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bazele pornite înainte de această migrare au tabelul creat deja de create_all (init_db).
+    # Tabelul gol se populează din messages_sent la prima pornire (message_rollup.rebuild_if_empty)
+    if sa.inspect(op.get_bind()).has_table('message_daily_rollup'):
+        return
+    op.create_table('message_daily_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('hotel_id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('template_name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['hotel_id'], ['hotels.id'], ),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'hotel_id', 'room_id', 'template_name', 'status', name='uq_message_daily_rollup_key')
+    )
+    op.create_index(op.f('ix_message_daily_rollup_id'), 'message_daily_rollup', ['id'], unique=False)
+    op.create_index(op.f('ix_message_daily_rollup_day'), 'message_daily_rollup', ['day'], unique=False)
+    op.create_index('ix_message_daily_rollup_hotel_id_day', 'message_daily_rollup', ['hotel_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_message_daily_rollup_hotel_id_day', table_name='message_daily_rollup')
+    op.drop_index(op.f('ix_message_daily_rollup_day'), table_name='message_daily_rollup')
+    op.drop_index(op.f('ix_message_daily_rollup_id'), table_name='message_daily_rollup')
+    op.drop_table('message_daily_rollup')
@@ -0,0 +1,61 @@
+"""
+Variantele async ale funcțiilor din crud, folosite de endpoint-urile `async def`.
+Fiecare rulează funcția sincronă corespunzătoare prin `db.run_sync`:
+- cu DB_ASYNC=true `db` este o AsyncSession, iar I/O-ul trece prin driverul async
+  (asyncpg/aiosqlite) fără să blocheze bucla de evenimente;
+- altfel `db` este o ThreadedSession și funcția rulează în pool-ul de fire.
+Logica (rollup-ul mesajelor, invalidarea cache-urilor) rămâne astfel doar în crud.
+Invalidarea response_cache (posibil un apel Redis) nu rulează în interiorul run_sync:
+crud doar notează etichetele, iar _run le invalidează după aceea, async.
+"""
+import crud
+import schemas
+from response_cache import response_cache
+
+
+async def _run(db, fn, *args):
+    tags = db.info[crud.DEFERRED_CACHE_TAGS] = set()
+    try:
+        return await db.run_sync(fn, *args)
+    finally:
+        db.info.pop(crud.DEFERRED_CACHE_TAGS, None)
+        if tags:
+            await response_cache.ainvalidate(tags)
+
+
+async def get_hotel_by_id(db, hotel_id: int):
+    return await _run(db, crud.get_hotel_by_id, hotel_id)
+
+
+async def get_room_by_whatsapp_number(db, whatsapp_number: str):
+    return await _run(db, crud.get_room_by_whatsapp_number, whatsapp_number)
+
+
+async def bulk_create_rooms(db, hotel_id: int, rooms: list) -> int:
+    return await _run(db, crud.bulk_create_rooms, hotel_id, rooms)
+
+
+async def create_hotel_document(db, hotel_id: int, filename: str, content: str):
+    return await _run(db, crud.create_hotel_document, hotel_id, filename, content)
+
+
+async def create_message_sent(db, msg: schemas.MessageSentCreate):
+    return await _run(db, crud.create_message_sent, msg)
+
+
+async def save_guest_conversation(db, hotel_id: int, room_id: int, received: list, ai_response: str,
+                                  status: str, language: str, source: str, usage: dict = None):
+    return await _run(db, crud.save_guest_conversation, hotel_id, room_id, received, ai_response,
+                             status, language, source, usage)
+
+
+async def get_user_by_email(db, email: str):
+    return await _run(db, crud.get_user_by_email, email)
+
+
+async def create_user(db, email: str, hashed_password: str, confirmation_token: str):
+    return await _run(db, crud.create_user, email, hashed_password, confirmation_token)
+
+
+async def update_user_password(db, email: str, hashed_password: str):
+    return await _run(db, crud.update_user_password, email, hashed_password)
@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Configurare cache pentru utilizatorii autentificați
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+
+
+def token_key(token: str) -> str:
+    """Cheia din cache este hash-ul token-ului, nu token-ul în sine."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    """
+    Cache LRU + TTL: hash token JWT -> utilizatorul autentificat.
+    O intrare nu trăiește mai mult decât token-ul (câmpul `exp`) și este ștearsă
+    la schimbarea parolei sau a statusului de confirmare al utilizatorului.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (principal, expires_at)
+        self._keys_by_email = {}  # email -> {key} pentru invalidare
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        key = token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, token: str, principal: dict, token_expires_at: Optional[float] = None):
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        key = token_key(token)
+        email = principal["email"]
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (principal, expires_at)
+            self._keys_by_email.setdefault(email, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        email = entry[0]["email"]
+        keys = self._keys_by_email.get(email)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_email[email]
+
+    def invalidate_user(self, email: str):
+        """Șterge toate token-urile din cache ale unui utilizator (resetare parolă, confirmare)."""
+        with self._lock:
+            for key in list(self._keys_by_email.get(email, ())):
+                self._remove(key)
+        logging.info(f"[AUTH-CACHE] Invalidare cache pentru {email}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_email.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, List, Optional
+
+# Mesajele aceluiași oaspete sosite în această fereastră primesc un singur răspuns
+CONVERSATION_DEBOUNCE_SECONDS = float(os.getenv("CONVERSATION_DEBOUNCE_SECONDS", 4))
+# Nu amânăm la nesfârșit un oaspete care scrie continuu
+CONVERSATION_MAX_WAIT_SECONDS = float(os.getenv("CONVERSATION_MAX_WAIT_SECONDS", 15))
+CONVERSATION_MAX_BUFFERED_MESSAGES = int(os.getenv("CONVERSATION_MAX_BUFFERED_MESSAGES", 10))
+# Numărul de replici (oaspete + asistent) păstrate drept context pentru model
+CONVERSATION_HISTORY_TURNS = int(os.getenv("CONVERSATION_HISTORY_TURNS", 6))
+CONVERSATION_MAX_CONVERSATIONS = int(os.getenv("CONVERSATION_MAX_CONVERSATIONS", 5000))
+
+# handler(phone, guest_name, messages, history) -> textul răspunsului trimis (sau None)
+BatchHandler = Callable[[str, str, List[str], List[dict]], Awaitable[Optional[str]]]
+
+
+class _PendingBatch:
+    def __init__(self, guest_name: str):
+        self.guest_name = guest_name
+        self.messages = []
+        self.started_at = time.monotonic()
+        self.timer = None
+
+
+class ConversationBatcher:
+    """
+    Grupează mesajele consecutive ale unui oaspete (debounce) într-un singur apel AI
+    și un singur răspuns, păstrând un context limitat al conversației.
+    """
+
+    def __init__(self, handler: BatchHandler, window: float = CONVERSATION_DEBOUNCE_SECONDS,
+                 max_wait: float = CONVERSATION_MAX_WAIT_SECONDS,
+                 max_buffered_messages: int = CONVERSATION_MAX_BUFFERED_MESSAGES,
+                 history_turns: int = CONVERSATION_HISTORY_TURNS,
+                 max_conversations: int = CONVERSATION_MAX_CONVERSATIONS):
+        self.handler = handler
+        self.window = window
+        self.max_wait = max_wait
+        self.max_buffered_messages = max_buffered_messages
+        self.history_turns = history_turns
+        self.max_conversations = max_conversations
+        self._pending = {}
+        self._history = OrderedDict()
+        # phone -> (lock, utilizatori): loturile aceluiași oaspete se procesează pe rând
+        self._phone_locks = {}
+        self.messages_received = 0
+        self.batches_flushed = 0
+
+    def history(self, phone: str) -> List[dict]:
+        return list(self._history.get(phone, ()))
+
+    def _remember(self, phone: str, role: str, content: str):
+        turns = self._history.get(phone)
+        if turns is None:
+            turns = deque(maxlen=self.history_turns)
+            self._history[phone] = turns
+        turns.append({"role": role, "content": content})
+        self._history.move_to_end(phone)
+        while len(self._history) > self.max_conversations:
+            self._history.popitem(last=False)
+
+    async def add(self, phone: str, guest_name: str, message: str):
+        """Adaugă un mesaj primit; răspunsul pleacă după ce oaspetele face o pauză."""
+        self.messages_received += 1
+        if self.window <= 0:
+            # Gruparea este dezactivată - răspundem imediat
+            batch = _PendingBatch(guest_name)
+            batch.messages.append(message)
+            await self._process(phone, batch)
+            return
+
+        batch = self._pending.get(phone)
+        if batch is None:
+            batch = _PendingBatch(guest_name)
+            self._pending[phone] = batch
+        batch.messages.append(message)
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+        waited = time.monotonic() - batch.started_at
+        if len(batch.messages) >= self.max_buffered_messages or waited >= self.max_wait:
+            batch.timer = asyncio.ensure_future(self.flush(phone))
+        else:
+            delay = min(self.window, self.max_wait - waited)
+            batch.timer = asyncio.ensure_future(self._flush_later(phone, delay))
+
+    async def _flush_later(self, phone: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        await self.flush(phone)
+
+    async def flush(self, phone: str):
+        batch = self._pending.pop(phone, None)
+        if batch is None:
+            return
+        if batch.timer is not None and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+        await self._process(phone, batch)
+
+    def _acquire_phone_lock(self, phone: str) -> asyncio.Lock:
+        lock, users = self._phone_locks.get(phone) or (asyncio.Lock(), 0)
+        self._phone_locks[phone] = (lock, users + 1)
+        return lock
+
+    def _release_phone_lock(self, phone: str):
+        lock, users = self._phone_locks[phone]
+        if users <= 1:
+            del self._phone_locks[phone]
+        else:
+            self._phone_locks[phone] = (lock, users - 1)
+
+    async def _process(self, phone: str, batch: _PendingBatch):
+        self.batches_flushed += 1
+        # Lotul următor al aceluiași oaspete așteaptă până când răspunsul acestuia a fost trimis
+        # și salvat în istoric: răspunsurile pleacă în ordine, iar modelul vede replica anterioară
+        lock = self._acquire_phone_lock(phone)
+        try:
+            async with lock:
+                await self._process_locked(phone, batch)
+        finally:
+            self._release_phone_lock(phone)
+
+    async def _process_locked(self, phone: str, batch: _PendingBatch):
+        history = self.history(phone)
+        logging.info(f"[BATCH] Procesare {len(batch.messages)} mesaje de la {phone} într-un singur răspuns")
+        try:
+            reply = await self.handler(phone, batch.guest_name, batch.messages, history)
+        except Exception as e:
+            logging.error(f"[BATCH] Eroare la procesarea mesajelor de la {phone}: {str(e)}")
+            return
+        self._remember(phone, "user", "\n".join(batch.messages))
+        if reply:
+            self._remember(phone, "assistant", reply)
+
+    async def flush_all(self):
+        for phone in list(self._pending):
+            await self.flush(phone)
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "pending_conversations": len(self._pending),
+            "processing_conversations": len(self._phone_locks),
+            "tracked_conversations": len(self._history),
+            "messages_received": self.messages_received,
+            "batches_flushed": self.batches_flushed,
+            "saved_calls": max(0, self.messages_received - self.batches_flushed - self._pending_messages()),
+        }
+
+    def _pending_messages(self) -> int:
+        return sum(len(batch.messages) for batch in self._pending.values())
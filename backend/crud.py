@@ -2,13 +2,50 @@ from sqlalchemy.orm import Session
 import models
 import schemas
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
+from response_cache import hotel_tag, hotels_tag, response_cache, room_tag
+
+# Cheia din db.info unde async_crud strânge etichetele de invalidat după run_sync
+DEFERRED_CACHE_TAGS = "deferred_cache_tags"
+
+def invalidate_reads(db: Session, tags: list):
+    """
+    După commit: invalidează răspunsurile din response_cache. Apelată din async_crud (run_sync),
+    doar notează etichetele - invalidarea (un apel Redis) se face apoi async, în afara sesiunii.
+    """
+    deferred = db.info.get(DEFERRED_CACHE_TAGS)
+    if deferred is not None:
+        deferred.update(tags)
+        return
+    response_cache.invalidate(tags)
+
+def invalidate_room_reads(db: Session, room_id: int, hotel_id: int = None):
+    """După commit: răspunsurile din cache care includ camera (listele hotelului, camera, setările)."""
+    if hotel_id is None:
+        hotel_id = db.query(models.Room.hotel_id).filter(models.Room.id == room_id).scalar()
+    tags = [hotels_tag(), room_tag(room_id)]
+    if hotel_id is not None:
+        tags.append(hotel_tag(hotel_id))
+    invalidate_reads(db, tags)
 
 def get_hotel_by_id(db: Session, hotel_id: int):
     return db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
 
+def hotel_with_rooms():
+    """
+    Camerele hotelurilor din pagină vin dintr-un singur SELECT ... WHERE hotel_id IN (...),
+    cu setările alăturate prin JOIN (relație unu-la-unu, nu multiplică rândurile).
+    Un JOIN direct pe hoteluri ar strica offset/limit, iar încărcarea leneșă ar face
+    câte o interogare per cameră.
+    """
+    return selectinload(models.Hotel.rooms).joinedload(models.Room.settings)
+
+def get_hotel_with_rooms(db: Session, hotel_id: int):
+    return db.query(models.Hotel).filter(models.Hotel.id == hotel_id).options(hotel_with_rooms()).first()
+
 def get_hotels(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Hotel).offset(skip).limit(limit).all()
+    # Ordinea explicită face paginarea stabilă între cereri
+    return db.query(models.Hotel).options(hotel_with_rooms()).order_by(models.Hotel.id).offset(skip).limit(limit).all()
 
 def create_hotel(db: Session, hotel: schemas.HotelCreate):
     db_hotel = models.Hotel(**hotel.dict())
@@ -19,6 +56,7 @@ def create_hotel(db: Session, hotel: schemas.HotelCreate):
         db.rollback()
         raise
     db.refresh(db_hotel)
+    invalidate_reads(db, [hotels_tag()])
     return db_hotel
 
 def update_hotel(db: Session, hotel_id: int, hotel_update: schemas.HotelUpdate):
@@ -29,20 +67,24 @@ def update_hotel(db: Session, hotel_id: int, hotel_update: schemas.HotelUpdate):
         setattr(db_hotel, field, value)
     db.commit()
     db.refresh(db_hotel)
+    invalidate_reads(db, [hotels_tag(), hotel_tag(hotel_id)])
     return db_hotel
 
 def delete_hotel(db: Session, hotel_id: int):
     db_hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
     if not db_hotel:
         return False
+    # Camerele rămase fără hotel (hotel_id devine NULL) se schimbă și ele
+    room_ids = [room_id for room_id, in db.query(models.Room.id).filter(models.Room.hotel_id == hotel_id)]
     db.delete(db_hotel)
     db.commit()
+    invalidate_reads(db, [hotels_tag(), hotel_tag(hotel_id)] + [room_tag(room_id) for room_id in room_ids])
     return True
 
 def get_rooms(db: Session, hotel_id: int, skip: int = 0, limit: int = 100):
     return db.query(models.Room).filter(models.Room.hotel_id == hotel_id).options(
         joinedload(models.Room.settings)
-    ).offset(skip).limit(limit).all()
+    ).order_by(models.Room.id).offset(skip).limit(limit).all()
 
 def get_room(db: Session, room_id: int):
     return db.query(models.Room).filter(models.Room.id == room_id).options(
@@ -50,18 +92,45 @@ def get_room(db: Session, room_id: int):
     ).first()
 
 def create_room(db: Session, room: schemas.RoomCreate, hotel_id: int):
-    db_room = models.Room(**room.dict(), hotel_id=hotel_id)
+    # Camera și setările ei implicite se salvează în același commit
+    db_room = models.Room(**room.dict(), hotel_id=hotel_id, settings=models.RoomSettings())
     db.add(db_room)
     db.commit()
     db.refresh(db_room)
-    
-    # Creăm setări implicite pentru cameră
-    default_settings = models.RoomSettings(room_id=db_room.id)
-    db.add(default_settings)
-    db.commit()
+    invalidate_room_reads(db, db_room.id, hotel_id)
     
     return db_room
 
+def bulk_create_rooms(db: Session, hotel_id: int, rooms: list):
+    """
+    Camerele (deja validate, schemas.RoomCreate) și setările lor implicite, într-o
+    singură tranzacție: un INSERT executemany pentru camere și un INSERT ... SELECT
+    pentru setările camerelor hotelului care nu le au încă. Returnează nr. de camere.
+    """
+    from sqlalchemy import insert, literal, select
+    if not rooms:
+        return 0
+    room_table = models.Room.__table__
+    settings_table = models.RoomSettings.__table__
+    defaults = schemas.RoomSettingsCreate()
+    try:
+        db.bulk_insert_mappings(models.Room, [dict(room.dict(), hotel_id=hotel_id) for room in rooms])
+        missing_settings = select(
+            room_table.c.id, literal(defaults.auto_send), literal(defaults.send_time)
+        ).select_from(
+            room_table.outerjoin(settings_table, settings_table.c.room_id == room_table.c.id)
+        ).where(room_table.c.hotel_id == hotel_id, settings_table.c.id.is_(None))
+        db.execute(insert(settings_table).from_select(["room_id", "auto_send", "send_time"], missing_settings))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidate_reads(db, [hotels_tag(), hotel_tag(hotel_id)])
+    return len(rooms)
+
+def get_room_by_whatsapp_number(db: Session, whatsapp_number: str):
+    return db.query(models.Room).filter(models.Room.whatsapp_number == whatsapp_number).first()
+
 def update_room(db: Session, room_id: int, room_update: schemas.RoomUpdate):
     db_room = db.query(models.Room).filter(models.Room.id == room_id).first()
     if not db_room:
@@ -70,44 +139,151 @@ def update_room(db: Session, room_id: int, room_update: schemas.RoomUpdate):
         setattr(db_room, field, value)
     db.commit()
     db.refresh(db_room)
+    invalidate_room_reads(db, room_id, db_room.hotel_id)
     return db_room
 
 def delete_room(db: Session, room_id: int):
     db_room = db.query(models.Room).filter(models.Room.id == room_id).first()
     if not db_room:
         return False
+    hotel_id = db_room.hotel_id
     db.delete(db_room)
     db.commit()
+    invalidate_room_reads(db, room_id, hotel_id)
     return True
 
 def create_message_sent(db: Session, msg: schemas.MessageSentCreate):
-    db_msg = models.MessageSent(**msg.dict())
+    data = msg.dict()
+    if data.get("sent_at") is None:
+        data.pop("sent_at", None)  # se folosește valoarea implicită (datetime.utcnow)
+    db_msg = models.MessageSent(**data)
     db.add(db_msg)
     db.commit()
     db.refresh(db_msg)
     return db_msg
 
-def list_messages_sent(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None):
+def save_guest_conversation(db: Session, hotel_id: int, room_id: int, received: list, ai_response: str,
+                            status: str, language: str, source: str, usage: dict = None):
+    """Mesajele primite de la oaspete, răspunsul AI și consumul lui, într-un singur commit."""
+    from datetime import datetime
+    today = datetime.now().date().isoformat()
+    for content in received:
+        db.add(models.MessageSent(
+            hotel_id=hotel_id,
+            room_id=room_id,
+            sent_date=today,
+            template_name="RECEIVED_MESSAGE",
+            status="received",
+            content=content
+        ))
+    ai_message = models.MessageSent(
+        hotel_id=hotel_id,
+        room_id=room_id,
+        sent_date=today,
+        template_name="AI_RESPONSE",
+        status=status,
+        content=ai_response
+    )
+    db.add(ai_message)
+    db.flush()
+    # Tokenii și latența apelului AI, salvate alături de rândul AI_RESPONSE
+    record_ai_usage(db, ai_message, language, source, usage)
+    db.commit()
+    return ai_message
+
+def parse_date_bound(value: str, end: bool = False):
+    """
+    Transformă un filtru de dată ('2025-05-17' sau ISO datetime) în limita pentru sent_at.
+    Pentru o dată fără oră, limita de final este începutul zilei următoare (exclusiv),
+    astfel încât end_date să includă toată ziua, ca la compararea vechilor șiruri sent_date.
+    """
+    from datetime import datetime, timedelta
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) <= 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def filter_sent_at(query, start_date: str = None, end_date: str = None, column=None):
+    # `column` permite aceleași filtre pe messages_sent_archive.sent_at
+    column = models.MessageSent.sent_at if column is None else column
+    if start_date:
+        query = query.filter(column >= parse_date_bound(start_date))
+    if end_date:
+        if len(end_date) <= 10:
+            query = query.filter(column < parse_date_bound(end_date, end=True))
+        else:
+            query = query.filter(column <= parse_date_bound(end_date, end=True))
+    return query
+
+def query_messages_sent(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                        end_date: str = None, cursor: str = None):
+    from sqlalchemy import tuple_
     query = db.query(models.MessageSent)
     if hotel_id:
         query = query.filter(models.MessageSent.hotel_id == hotel_id)
     if room_id:
         query = query.filter(models.MessageSent.room_id == room_id)
-    if start_date:
-        query = query.filter(models.MessageSent.sent_date >= start_date)
-    if end_date:
-        query = query.filter(models.MessageSent.sent_date <= end_date)
-    return query.order_by(models.MessageSent.sent_date.desc()).all()
+    query = filter_sent_at(query, start_date, end_date)
+    if cursor:
+        # Doar mesajele de după ultimul rând al paginii anterioare, în ordinea (sent_at, id) descrescătoare
+        sent_at, message_id = decode_message_cursor(cursor)
+        query = query.filter(tuple_(models.MessageSent.sent_at, models.MessageSent.id) < tuple_(sent_at, message_id))
+    return query.order_by(models.MessageSent.sent_at.desc(), models.MessageSent.id.desc())
+
+def query_archived_messages(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                            end_date: str = None):
+    archive = models.MessageArchive
+    query = db.query(archive)
+    if hotel_id:
+        query = query.filter(archive.hotel_id == hotel_id)
+    if room_id:
+        query = query.filter(archive.room_id == room_id)
+    query = filter_sent_at(query, start_date, end_date, column=archive.sent_at)
+    return query.order_by(archive.sent_at, archive.id)
+
+def list_messages_sent(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None):
+    return query_messages_sent(db, hotel_id, room_id, start_date, end_date).all()
+
+def encode_message_cursor(message: models.MessageSent) -> str:
+    import base64
+    raw = f"{message.sent_at.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_message_cursor(cursor: str):
+    """Returnează (sent_at, id) din cursor; ValueError pentru un cursor invalid."""
+    import base64
+    import binascii
+    from datetime import datetime
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        sent_at, message_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(sent_at), int(message_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def page_messages_sent(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                       end_date: str = None, limit: int = 100, cursor: str = None):
+    """
+    Paginare keyset pe (sent_at, id), descrescător: pagina următoare începe după
+    ultimul mesaj din pagina curentă, deci costul nu crește cu adâncimea paginii.
+    Returnează (mesaje, next_cursor).
+    """
+    items = query_messages_sent(db, hotel_id, room_id, start_date, end_date, cursor).limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_message_cursor(items[-1])
+    return items, next_cursor
+
+def count_messages_sent(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None):
+    return query_messages_sent(db, hotel_id, room_id, start_date, end_date).order_by(None).count()
 
 def messages_stats(db: Session, hotel_id: int = None, start_date: str = None, end_date: str = None):
     from sqlalchemy import func
     query = db.query(models.MessageSent.hotel_id, func.count(models.MessageSent.id).label('total_messages'))
     if hotel_id:
         query = query.filter(models.MessageSent.hotel_id == hotel_id)
-    if start_date:
-        query = query.filter(models.MessageSent.sent_date >= start_date)
-    if end_date:
-        query = query.filter(models.MessageSent.sent_date <= end_date)
+    query = filter_sent_at(query, start_date, end_date)
     query = query.group_by(models.MessageSent.hotel_id)
     return query.all()
 
@@ -124,14 +300,112 @@ def messages_stats_by_room(db: Session, hotel_id: int = None, start_date: str =
     
     if hotel_id:
         query = query.filter(models.MessageSent.hotel_id == hotel_id)
-    if start_date:
-        query = query.filter(models.MessageSent.sent_date >= start_date)
-    if end_date:
-        query = query.filter(models.MessageSent.sent_date <= end_date)
+    query = filter_sent_at(query, start_date, end_date)
     
     query = query.group_by(models.MessageSent.room_id, models.MessageSent.hotel_id)
     return query.all()
 
+def filter_rollup_days(query, start_date: str = None, end_date: str = None):
+    if start_date:
+        query = query.filter(models.MessageDailyRollup.day >= parse_date_bound(start_date).date())
+    if end_date:
+        query = query.filter(models.MessageDailyRollup.day <= parse_date_bound(end_date).date())
+    return query
+
+def is_day_range(start_date: str = None, end_date: str = None) -> bool:
+    """Intervalul are doar zile întregi (fără oră), deci poate fi citit din message_daily_rollup."""
+    return all(not value or len(value) <= 10 for value in (start_date, end_date))
+
+def messages_stats_summary(db: Session, hotel_id: int = None, start_date: str = None, end_date: str = None):
+    """
+    Statisticile pe hotel și pe cameră (cu nume) dintr-o singură interogare.
+    Pentru intervale de zile întregi se citește message_daily_rollup, altfel messages_sent.
+    Pe PostgreSQL totalurile pe hotel vin din GROUPING SETS; în rest (SQLite, MySQL)
+    se grupează pe cameră și totalurile pe hotel se adună în Python.
+    Mesajele fără cameră existentă intră doar în totalul hotelului.
+    """
+    from sqlalchemy import func, tuple_
+    use_rollup = is_day_range(start_date, end_date)
+    if use_rollup:
+        source = models.MessageDailyRollup
+        total = func.sum(source.message_count)
+    else:
+        source = models.MessageSent
+        total = func.count(source.id)
+    hotel_key = (source.hotel_id, models.Hotel.name)
+    room_key = (source.room_id, models.Room.name)
+    use_grouping_sets = db.bind.dialect.name == "postgresql"
+
+    columns = [
+        source.hotel_id, models.Hotel.name.label('hotel_name'),
+        source.room_id, models.Room.name.label('room_name'),
+        total.label('total_messages'),
+    ]
+    if use_grouping_sets:
+        columns.append(func.grouping(source.room_id).label('is_hotel_total'))
+    query = (
+        db.query(*columns)
+        .join(models.Hotel, models.Hotel.id == source.hotel_id)
+        .outerjoin(models.Room, models.Room.id == source.room_id)
+    )
+    if hotel_id:
+        query = query.filter(source.hotel_id == hotel_id)
+    if use_rollup:
+        query = filter_rollup_days(query, start_date, end_date)
+    else:
+        query = filter_sent_at(query, start_date, end_date)
+    if use_grouping_sets:
+        query = query.group_by(func.grouping_sets(tuple_(*hotel_key, *room_key), tuple_(*hotel_key)))
+    else:
+        query = query.group_by(*hotel_key, *room_key)
+
+    hotels = {}
+    rooms = []
+    for row in query.all():
+        if use_grouping_sets and row.is_hotel_total:
+            hotels[row.hotel_id] = {"hotel_name": row.hotel_name, "total_messages": int(row.total_messages)}
+            continue
+        if not use_grouping_sets:
+            totals = hotels.setdefault(row.hotel_id, {"hotel_name": row.hotel_name, "total_messages": 0})
+            totals["total_messages"] += int(row.total_messages)
+        if row.room_id is not None and row.room_name is not None:
+            rooms.append({
+                "hotel_id": row.hotel_id,
+                "hotel_name": row.hotel_name,
+                "room_id": row.room_id,
+                "room_name": row.room_name,
+                "total_messages": int(row.total_messages),
+            })
+
+    result = [
+        {"hotel_id": hotel, "hotel_name": totals["hotel_name"], "room_id": None,
+         "room_name": "Toate camerele", "total_messages": totals["total_messages"]}
+        for hotel, totals in hotels.items()
+    ]
+    return result + rooms
+
+def messages_timeseries(db: Session, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                        end_date: str = None, group_by: str = None):
+    """
+    Numărul de mesaje pe zi din message_daily_rollup, opțional împărțit după
+    'status' sau 'template_name'. Returnează [(zi, cheie sau None, total)].
+    """
+    from sqlalchemy import func
+    rollup = models.MessageDailyRollup
+    group_column = getattr(rollup, group_by) if group_by else None
+    columns = [rollup.day] if group_column is None else [rollup.day, group_column]
+    query = db.query(*columns, func.sum(rollup.message_count))
+    if hotel_id:
+        query = query.filter(rollup.hotel_id == hotel_id)
+    if room_id:
+        query = query.filter(rollup.room_id == room_id)
+    query = filter_rollup_days(query, start_date, end_date)
+    if group_column is not None:
+        rows = query.group_by(rollup.day, group_column).all()
+        return [(day, key, int(total)) for day, key, total in rows]
+    rows = query.group_by(rollup.day).all()
+    return [(day, None, int(total)) for day, total in rows]
+
 # --- Room Settings CRUD ---
 def get_room_settings(db: Session, room_id: int):
     return db.query(models.RoomSettings).filter(models.RoomSettings.room_id == room_id).first()
@@ -141,6 +415,7 @@ def create_room_settings(db: Session, settings: schemas.RoomSettingsCreate, room
     db.add(db_settings)
     db.commit()
     db.refresh(db_settings)
+    invalidate_room_reads(db, room_id)
     return db_settings
 
 def update_room_settings(db: Session, room_id: int, settings_update: schemas.RoomSettingsUpdate):
@@ -157,8 +432,191 @@ def update_room_settings(db: Session, room_id: int, settings_update: schemas.Roo
     
     db.commit()
     db.refresh(db_settings)
+    invalidate_room_reads(db, room_id)
     return db_settings
 
+# --- Hotel Answers (răspunsuri predefinite pentru întrebări frecvente) ---
+def get_hotel_answers(db: Session, hotel_id: int):
+    return db.query(models.HotelAnswer).filter(models.HotelAnswer.hotel_id == hotel_id).all()
+
+def upsert_hotel_answer(db: Session, hotel_id: int, answer: schemas.HotelAnswerCreate):
+    db_answer = db.query(models.HotelAnswer).filter(
+        models.HotelAnswer.hotel_id == hotel_id,
+        models.HotelAnswer.intent == answer.intent,
+        models.HotelAnswer.language == answer.language
+    ).first()
+    if db_answer:
+        db_answer.answer = answer.answer
+    else:
+        db_answer = models.HotelAnswer(**answer.dict(), hotel_id=hotel_id)
+        db.add(db_answer)
+    db.commit()
+    db.refresh(db_answer)
+    return db_answer
+
+def delete_hotel_answer(db: Session, hotel_id: int, answer_id: int):
+    db_answer = db.query(models.HotelAnswer).filter(
+        models.HotelAnswer.id == answer_id,
+        models.HotelAnswer.hotel_id == hotel_id
+    ).first()
+    if not db_answer:
+        return False
+    db.delete(db_answer)
+    db.commit()
+    return True
+
+# --- Hotel Documents (FAQ pentru baza de cunoștințe) ---
+def get_hotel_documents(db: Session, hotel_id: int):
+    return db.query(models.HotelDocument).filter(models.HotelDocument.hotel_id == hotel_id).all()
+
+def create_hotel_document(db: Session, hotel_id: int, filename: str, content: str):
+    from datetime import datetime
+    db_document = models.HotelDocument(
+        hotel_id=hotel_id,
+        filename=filename,
+        content=content,
+        uploaded_at=datetime.utcnow().isoformat()
+    )
+    db.add(db_document)
+    db.commit()
+    db.refresh(db_document)
+    return db_document
+
+def delete_hotel_document(db: Session, hotel_id: int, document_id: int):
+    db_document = db.query(models.HotelDocument).filter(
+        models.HotelDocument.id == document_id,
+        models.HotelDocument.hotel_id == hotel_id
+    ).first()
+    if not db_document:
+        return False
+    db.delete(db_document)
+    db.commit()
+    return True
+
+# --- AI Usage (tokeni și latență per răspuns AI) ---
+def record_ai_usage(db: Session, message: models.MessageSent, language: str, source: str, usage: dict = None):
+    """Adaugă în sesiune consumul pentru răspunsul AI salvat în `message` (commit-ul îl face apelantul)."""
+    from datetime import datetime
+    usage = usage or {}
+    db_usage = models.AIUsage(
+        message_id=message.id,
+        hotel_id=message.hotel_id,
+        language=language,
+        source=source,
+        model=usage.get("model"),
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        total_tokens=usage.get("total_tokens", 0),
+        prompt_chars=usage.get("prompt_chars", 0),
+        latency_ms=usage.get("latency_ms", 0),
+        estimated=usage.get("estimated", False),
+        created_at=datetime.utcnow().isoformat()
+    )
+    db.add(db_usage)
+    return db_usage
+
+def ai_usage_stats(db: Session, group_by: str = "hotel", start_date: str = None, end_date: str = None):
+    from sqlalchemy import func, case
+    group_column = models.AIUsage.hotel_id if group_by == "hotel" else models.AIUsage.language
+    is_llm = case((models.AIUsage.source == "llm", 1), else_=0)
+    query = db.query(
+        group_column.label(group_by),
+        func.count(models.AIUsage.id).label('replies'),
+        func.sum(is_llm).label('llm_calls'),
+        func.sum(models.AIUsage.prompt_tokens).label('prompt_tokens'),
+        func.sum(models.AIUsage.completion_tokens).label('completion_tokens'),
+        func.sum(models.AIUsage.total_tokens).label('total_tokens'),
+        func.avg(case((models.AIUsage.source == "llm", models.AIUsage.latency_ms))).label('avg_llm_latency_ms')
+    )
+    if start_date:
+        query = query.filter(models.AIUsage.created_at >= start_date)
+    if end_date:
+        query = query.filter(models.AIUsage.created_at <= end_date)
+    rows = query.group_by(group_column).all()
+    return [
+        {
+            group_by: row[0],
+            "replies": row.replies,
+            "llm_calls": int(row.llm_calls or 0),
+            "prompt_tokens": int(row.prompt_tokens or 0),
+            "completion_tokens": int(row.completion_tokens or 0),
+            "total_tokens": int(row.total_tokens or 0),
+            "avg_llm_latency_ms": round(float(row.avg_llm_latency_ms), 1) if row.avg_llm_latency_ms is not None else None
+        }
+        for row in rows
+    ]
+
+def ai_latency_report(db: Session, hotel_id: int = None, limit: int = 5000):
+    """
+    Latența apelurilor OpenAI grupată pe dimensiunea promptului, plus coeficientul de
+    corelație Pearson între tokenii de prompt și latență (ultimele `limit` apeluri).
+    """
+    query = db.query(models.AIUsage.prompt_tokens, models.AIUsage.latency_ms).filter(models.AIUsage.source == "llm")
+    if hotel_id:
+        query = query.filter(models.AIUsage.hotel_id == hotel_id)
+    rows = query.order_by(models.AIUsage.id.desc()).limit(limit).all()
+
+    buckets = [(0, 250), (250, 500), (500, 1000), (1000, 2000), (2000, None)]
+    report = []
+    for low, high in buckets:
+        latencies = [latency for tokens, latency in rows if tokens >= low and (high is None or tokens < high)]
+        report.append({
+            "prompt_tokens": f"{low}-{high}" if high else f"{low}+",
+            "calls": len(latencies),
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else None
+        })
+
+    correlation = None
+    if len(rows) > 1:
+        xs = [float(tokens) for tokens, _ in rows]
+        ys = [float(latency) for _, latency in rows]
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(ys) / len(ys)
+        cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        var_y = sum((y - mean_y) ** 2 for y in ys)
+        if var_x and var_y:
+            correlation = round(cov / (var_x ** 0.5 * var_y ** 0.5), 4)
+    return {"calls": len(rows), "correlation": correlation, "buckets": report}
+
+# --- Users (conturile aplicației) ---
+def get_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def get_user_by_confirmation_token(db: Session, token: str):
+    return db.query(models.User).filter(models.User.confirmation_token == token).first()
+
+def create_user(db: Session, email: str, hashed_password: str, confirmation_token: str):
+    from datetime import datetime
+    db_user = models.User(
+        email=email,
+        password=hashed_password,
+        confirmed=False,
+        confirmation_token=confirmation_token,
+        created_at=datetime.utcnow().isoformat()
+    )
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+def confirm_user(db: Session, token: str):
+    db_user = get_user_by_confirmation_token(db, token)
+    if not db_user:
+        return None
+    db_user.confirmed = True
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+def update_user_password(db: Session, email: str, hashed_password: str):
+    db_user = get_user_by_email(db, email)
+    if not db_user:
+        return None
+    db_user.password = hashed_password
+    db.commit()
+    return db_user
+
 # --- Reservations ---
 def get_today_reservations(db: Session, room_id: int):
     # Această funcție va fi implementată pentru a obține rezervările de astăzi din calendar
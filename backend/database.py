@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+import asyncio
+import functools
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, SingletonThreadPool, StaticPool
 import models
 from models import Base
 import os
@@ -25,18 +28,162 @@ else:
 
 print(f"Database type: {'SQLite' if SQLALCHEMY_DATABASE_URL.startswith('sqlite') else 'PostgreSQL/MySQL'}")
 
-# Configurare engine SQLAlchemy
-connect_args = {}
-if SQLALCHEMY_DATABASE_URL.startswith('sqlite'):
-    connect_args = {"check_same_thread": False}
+# Configurare pool de conexiuni (valorile implicite depind de tipul bazei de date)
+POOL_CLASSES = {
+    "queue": QueuePool,
+    "null": NullPool,
+    "static": StaticPool,
+    "singleton": SingletonThreadPool,
+}
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith('sqlite')
+IS_SQLITE_MEMORY = IS_SQLITE and (':memory:' in SQLALCHEMY_DATABASE_URL or SQLALCHEMY_DATABASE_URL in ('sqlite://', 'sqlite:///'))
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args=connect_args, 
-    poolclass=NullPool
-)
+DB_POOL_CLASS = os.getenv('DB_POOL_CLASS', 'static' if IS_SQLITE_MEMORY else 'queue').lower()
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5 if IS_SQLITE else 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10 if IS_SQLITE else 20))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+# Render/Postgres închide conexiunile inactive; le reciclăm înainte să expire
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', -1 if IS_SQLITE else 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'false' if IS_SQLITE else 'true').lower() in ('1', 'true', 'yes')
+
+# Pragma-uri SQLite: WAL permite citiri concurente în timpul scrierilor
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 20000))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+
+# Sesiuni async pentru endpoint-urile `async def`: true = driver async (asyncpg și aiosqlite sunt
+# în requirements.txt, aiomysql se instalează separat), false = sesiunea sincronă rulată în pool-ul de fire
+DB_ASYNC = os.getenv('DB_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+if DB_POOL_CLASS not in POOL_CLASSES:
+    raise ValueError(f"DB_POOL_CLASS invalid: '{DB_POOL_CLASS}' (opțiuni: {', '.join(POOL_CLASSES)})")
+
+
+def engine_options(pool_class: str = DB_POOL_CLASS) -> dict:
+    """Argumentele pentru create_engine în funcție de tipul de pool ales."""
+    options = {"poolclass": POOL_CLASSES[pool_class], "pool_pre_ping": DB_POOL_PRE_PING}
+    if pool_class == "queue":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if not IS_SQLITE_MEMORY:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL, pool_class: str = DB_POOL_CLASS):
+    # Configurare engine SQLAlchemy
+    connect_args = {}
+    if url.startswith('sqlite'):
+        connect_args = {"check_same_thread": False}
+
+    db_engine = create_engine(url, connect_args=connect_args, **engine_options(pool_class))
+    if url.startswith('sqlite'):
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+def async_url(url: str = SQLALCHEMY_DATABASE_URL) -> str:
+    """postgresql://... -> postgresql+asyncpg://... (la fel pentru sqlite și mysql)."""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Nu există driver async configurat pentru '{backend}'")
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+
+def make_async_engine(url: str = SQLALCHEMY_DATABASE_URL, pool_class: str = DB_POOL_CLASS):
+    options = engine_options(pool_class)
+    if pool_class == "queue":
+        # Engine-urile async au nevoie de varianta asyncio a QueuePool
+        options["poolclass"] = AsyncAdaptedQueuePool
+    db_engine = create_async_engine(async_url(url), **options)
+    if url.startswith('sqlite'):
+        event.listen(db_engine.sync_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+class AsyncBackedSession(Session):
+    """
+    Sesiunea sincronă din spatele unei AsyncSession. Evenimentele ORM înregistrate
+    pe SessionLocal (ex: message_rollup) trebuie înregistrate și pe această clasă.
+    """
+
+
+class ThreadedSession:
+    """
+    Aceeași interfață ca AsyncSession pentru async_crud (run_sync, close, context manager),
+    peste o sesiune sincronă ale cărei apeluri rulează în pool-ul de fire, nu în bucla de evenimente.
+    """
+
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            return fn(self.sync_session, *args, **kwargs)
+        finally:
+            # Conexiunea revine în pool din același fir, la sfârșitul fiecărui apel: dacă ar
+            # aștepta close(), firele blocate în așteptarea unei conexiuni ar putea ocupa tot
+            # pool-ul de fire și nimeni n-ar mai elibera conexiunile (deadlock)
+            self.sync_session.close()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self._call, fn, *args, **kwargs))
+
+    async def close(self):
+        # Sesiunea nu mai ține nicio conexiune după run_sync - închiderea nu face I/O
+        self.sync_session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+engine = make_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = make_async_engine() if DB_ASYNC else None
+# expire_on_commit=False: obiectele întoarse de async_crud se citesc după commit fără I/O implicit
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, sync_session_class=AsyncBackedSession,
+    autoflush=False, expire_on_commit=False,
+) if DB_ASYNC else None
+
+
+def async_session():
+    """Sesiune pentru cod async: AsyncSession cu DB_ASYNC=true, altfel ThreadedSession."""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return ThreadedSession(SessionLocal(expire_on_commit=False))
+
 def init_db():
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,238 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+import models
+from ai_cache import normalize_message
+
+# Încrederea = cuvintele expresiei / (cuvintele expresiei + 0.5 per cuvânt de întrebare);
+# 0.65 acceptă "what time is check in" (0.67), dar nu "park" cu două cuvinte de întrebare (0.5)
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.65))
+# Mesajele lungi conțin de obicei mai multe întrebări - le lăsăm modelului
+INTENT_MAX_TOKENS = int(os.getenv("INTENT_MAX_TOKENS", 12))
+HOTEL_ANSWERS_TTL = float(os.getenv("HOTEL_ANSWERS_TTL", 300))
+# Latența estimată a unui apel OpenAI, folosită până avem măsurători reale
+DEFAULT_LLM_LATENCY = float(os.getenv("DEFAULT_LLM_LATENCY", 2.0))
+
+# Expresiile (normalizate, fără diacritice) care identifică fiecare intenție, în limbile
+# acoperite de get_system_prompt. Doar expresii specifice intenției: cuvintele generice
+# ("wann", "where", "car", "password") apar și în mesaje despre altceva.
+INTENT_KEYWORDS = {
+    'thanks': {
+        'ro': ["multumesc", "multumim", "mersi", "multumesc frumos", "va multumesc"],
+        'en': ["thanks", "thank you", "thx", "many thanks", "thank you very much"],
+        'de': ["danke", "danke schon", "vielen dank", "dankeschon"],
+        'fr': ["merci", "merci beaucoup"],
+        'es': ["gracias", "muchas gracias"],
+        'it': ["grazie", "grazie mille"],
+    },
+    'checkin_time': {
+        'ro': ["check in", "checkin", "check in ul", "ora de check in", "ne putem caza", "ora sosirii"],
+        'en': ["check in", "checkin", "check in time", "arrival time", "early check in"],
+        'de': ["check in", "einchecken", "ankunftszeit"],
+        'fr': ["check in", "heure d arrivee"],
+        'es': ["check in", "hora de llegada"],
+        'it': ["check in", "orario di arrivo"],
+    },
+    'checkout_time': {
+        'ro': ["check out", "checkout", "check out ul", "ora plecarii", "eliberam camera"],
+        'en': ["check out", "checkout", "check out time", "late check out", "departure time"],
+        'de': ["check out", "auschecken", "abreise"],
+        'fr': ["check out", "heure de depart", "liberer la chambre"],
+        'es': ["check out", "hora de salida"],
+        'it': ["check out", "orario di partenza"],
+    },
+    'wifi': {
+        'ro': ["wifi", "wi fi", "parola wifi", "parola de la wifi", "internet"],
+        'en': ["wifi", "wi fi", "wifi password", "internet"],
+        'de': ["wlan", "wifi", "wlan passwort", "internet"],
+        'fr': ["wifi", "wi fi", "mot de passe wifi", "mot de passe du wifi", "internet"],
+        'es': ["wifi", "wi fi", "contrasena del wifi", "clave del wifi", "internet"],
+        'it': ["wifi", "wi fi", "password del wifi", "internet"],
+    },
+    'parking': {
+        'ro': ["parcare", "parcarea", "parcam", "parchez", "loc de parcare"],
+        'en': ["parking", "park", "car park", "parking spot", "park my car", "park the car"],
+        'de': ["parkplatz", "parken", "parkhaus"],
+        'fr': ["parking", "stationnement", "garer"],
+        'es': ["aparcamiento", "estacionamiento", "parking", "aparcar"],
+        'it': ["parcheggio", "parcheggiare"],
+    },
+    'directions': {
+        'ro': ["adresa", "locatia", "cum ajung", "directii", "unde se afla hotelul"],
+        'en': ["address", "location", "directions", "how do i get", "how to get", "where are you located"],
+        'de': ["adresse", "wegbeschreibung", "wie komme ich", "wo ist das hotel"],
+        'fr': ["adresse", "itineraire", "comment venir", "ou se trouve l hotel"],
+        'es': ["direccion", "ubicacion", "como llegar"],
+        'it': ["indirizzo", "indicazioni", "come arrivare"],
+    },
+}
+
+# Cuvinte de legătură și formule de politețe: nu schimbă sensul mesajului (pondere 0)
+STOP_WORDS = set("""
+a an the is are am be do does did have has can could may might will would there it this that to of for in on at
+i we you my our your me us please pls hi hello hey dear good morning evening afternoon ok okay
+buna ziua seara salut va te rog ne noi eu este e sunt la de pentru si cu in pe un o ati aveti avem putem exista
+hallo guten tag morgen abend bitte ist sind der die das den dem ein eine wir ich sie ihr es gibt um zu haben
+bonjour bonsoir salut s il vous plait est sont le la les un une nous je on du des au avez y
+hola buenos dias tardes por favor el los las es son hay una nosotros yo tienen
+ciao buongiorno buonasera per favore lo gli e sono c una noi io avete
+""".split())
+# Cuvinte de întrebare: acceptate lângă expresia intenției, dar scad încrederea (pondere 0.5)
+QUESTION_WORDS = set("""
+what when where how which time hour
+ce cand unde cum care ora
+was wann wo wie welche uhr
+quand ou comment quelle quel heure
+que cuando donde como hora
+cosa quando dove come quale
+""".split())
+QUESTION_WORD_WEIGHT = 0.5
+
+# Răspunsuri implicite pentru intențiile care nu depind de hotel
+DEFAULT_ANSWERS = {
+    'thanks': {
+        'ro': "Cu mare plăcere, {guest_name}! Vă dorim un sejur minunat.",
+        'en': "You're very welcome, {guest_name}! We wish you a wonderful stay.",
+        'de': "Sehr gern geschehen, {guest_name}! Wir wünschen Ihnen einen wunderbaren Aufenthalt.",
+        'fr': "Avec plaisir, {guest_name} ! Nous vous souhaitons un excellent séjour.",
+        'es': "¡De nada, {guest_name}! Le deseamos una estancia maravillosa.",
+        'it': "Prego, {guest_name}! Le auguriamo un soggiorno meraviglioso.",
+    },
+}
+
+
+class IntentClassifier:
+    """
+    Clasificator local de intenții pe expresii întregi. Un mesaj este recunoscut doar dacă
+    toate cuvintele lui sunt explicate: expresiile unei singure intenții, cuvinte de
+    legătură sau cuvinte de întrebare. Orice alt conținut ("thanks, but the shower is
+    broken") înseamnă că mesajul trebuie trimis modelului.
+    """
+
+    def __init__(self, keywords: dict = INTENT_KEYWORDS):
+        self.phrases = {}  # intent -> expresii normalizate, cele lungi primele
+        for intent, languages in keywords.items():
+            phrases = {normalize_message(p) for texts in languages.values() for p in texts}
+            self.phrases[intent] = sorted((tuple(p.split()) for p in phrases if p), key=len, reverse=True)
+
+    @staticmethod
+    def _find(tokens: list, phrase: tuple, covered: list) -> int:
+        """Marchează aparițiile expresiei (cuvinte întregi, necontorizate încă); întoarce nr. de cuvinte acoperite."""
+        found = 0
+        size = len(phrase)
+        for start in range(len(tokens) - size + 1):
+            if tuple(tokens[start:start + size]) == phrase and not any(covered[start:start + size]):
+                covered[start:start + size] = [True] * size
+                found += size
+        return found
+
+    def classify(self, message: str):
+        """Returnează (intenție, încredere) sau (None, 0.0) dacă mesajul nu este recunoscut."""
+        tokens = normalize_message(message).split()
+        if not tokens or len(tokens) > INTENT_MAX_TOKENS:
+            return None, 0.0
+
+        matches = {}  # intent -> (cuvinte acoperite, marcaj per poziție)
+        for intent, phrases in self.phrases.items():
+            covered = [False] * len(tokens)
+            found = sum(self._find(tokens, phrase, covered) for phrase in phrases)
+            if found:
+                matches[intent] = (found, covered)
+        # Nicio intenție sau mai multe într-un singur mesaj: răspunde modelul
+        if len(matches) != 1:
+            return None, 0.0
+
+        intent, (found, covered) = next(iter(matches.items()))
+        weight = 0.0
+        for token, is_covered in zip(tokens, covered):
+            if is_covered or token in STOP_WORDS:
+                continue
+            if token not in QUESTION_WORDS:
+                return None, 0.0
+            weight += QUESTION_WORD_WEIGHT
+        # Cât din mesaj este chiar expresia intenției
+        return intent, round(found / (found + weight), 4)
+
+
+class LocalResponder:
+    """
+    Primul nivel de răspuns: mesajele frecvente recunoscute cu încredere primesc
+    răspunsul predefinit al hotelului, fără apel la OpenAI.
+    """
+
+    def __init__(self, session_factory, classifier: Optional[IntentClassifier] = None,
+                 threshold: float = INTENT_CONFIDENCE_THRESHOLD, ttl: float = HOTEL_ANSWERS_TTL):
+        self.session_factory = session_factory
+        self.classifier = classifier or IntentClassifier()
+        self.threshold = threshold
+        self.ttl = ttl
+        self._answers = {}  # hotel_id -> ({(intent, language): answer}, loaded_at)
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.handled = 0
+        self.handled_by_intent = Counter()
+        self.saved_latency = 0.0
+
+    def _load_answers(self, hotel_id: int) -> dict:
+        db = self.session_factory()
+        try:
+            rows = db.query(models.HotelAnswer).filter(models.HotelAnswer.hotel_id == hotel_id).all()
+            return {(row.intent, row.language): row.answer for row in rows}
+        finally:
+            db.close()
+
+    def hotel_answers(self, hotel_id: Optional[int]) -> dict:
+        if hotel_id is None:
+            return {}
+        with self._lock:
+            cached = self._answers.get(hotel_id)
+        if cached and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        try:
+            answers = self._load_answers(hotel_id)
+        except Exception as e:
+            logging.error(f"[INTENT] Eroare la citirea răspunsurilor pentru hotelul {hotel_id}: {str(e)}")
+            answers = {}
+        with self._lock:
+            self._answers[hotel_id] = (answers, time.monotonic())
+        return answers
+
+    def invalidate(self, hotel_id: Optional[int] = None):
+        with self._lock:
+            if hotel_id is None:
+                self._answers.clear()
+            else:
+                self._answers.pop(hotel_id, None)
+
+    def respond(self, message: str, language: str, hotel_id: Optional[int] = None, guest_name: str = "",
+                hotel_phone: str = "", expected_latency: Optional[float] = None) -> Optional[str]:
+        """Returnează răspunsul local sau None dacă mesajul trebuie trimis modelului."""
+        self.messages += 1
+        intent, confidence = self.classifier.classify(message)
+        if intent is None or confidence < self.threshold:
+            return None
+
+        answer = self.hotel_answers(hotel_id).get((intent, language)) \
+            or DEFAULT_ANSWERS.get(intent, {}).get(language)
+        if not answer:
+            return None
+
+        self.handled += 1
+        self.handled_by_intent[intent] += 1
+        self.saved_latency += expected_latency or DEFAULT_LLM_LATENCY
+        logging.info(f"[INTENT] Mesaj tratat local: intenție '{intent}' (încredere {confidence}), limbă {language}")
+        return answer.replace("{guest_name}", guest_name or "").replace("{hotel_phone}", hotel_phone or "")
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "messages": self.messages,
+            "handled_locally": self.handled,
+            "local_share": round(self.handled / self.messages, 4) if self.messages else 0.0,
+            "handled_by_intent": dict(self.handled_by_intent),
+            "saved_latency_seconds": round(self.saved_latency, 3),
+        }
@@ -0,0 +1,173 @@
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+import models
+from ai_cache import normalize_message
+
+KB_CHUNK_WORDS = int(os.getenv("KB_CHUNK_WORDS", 80))
+KB_CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", 15))
+KB_TOP_K = int(os.getenv("KB_TOP_K", 3))
+# Bugetul de tokeni pentru informațiile despre hotel incluse în prompt
+KB_TOKEN_BUDGET = int(os.getenv("KB_TOKEN_BUDGET", 300))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimare rapidă a numărului de tokeni (aprox. 4 caractere per token)."""
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> list:
+    return [token for token in normalize_message(text).split() if len(token) > 1]
+
+
+def chunk_text(text: str, chunk_words: int = KB_CHUNK_WORDS, overlap: int = KB_CHUNK_OVERLAP) -> list:
+    """Împarte textul în fragmente de ~chunk_words cuvinte, respectând limitele propozițiilor."""
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text or "") if s.strip()]
+    chunks = []
+    current = []
+    for sentence in sentences:
+        words = sentence.split()
+        if current and len(current) + len(words) > chunk_words:
+            chunks.append(" ".join(current))
+            current = current[-overlap:] if overlap else []
+        current.extend(words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class HotelIndex:
+    """
+    Index BM25 pentru fragmentele de text ale unui singur hotel.
+    Nu se modifică după construire: o sursă nouă produce un index nou (with_source/without_source),
+    care înlocuiește printr-o singură atribuire indexul citit de search() fără lock.
+    """
+
+    def __init__(self, sources: dict = None):
+        self.sources = dict(sources or {})  # cheia sursei -> listă de fragmente
+        self.chunks = [chunk for key in sorted(self.sources) for chunk in self.sources[key]]
+        self.postings = {}  # token -> [(index fragment, frecvență)]
+        self.lengths = []
+        for position, chunk in enumerate(self.chunks):
+            tokens = tokenize(chunk)
+            self.lengths.append(len(tokens))
+            for token, frequency in Counter(tokens).items():
+                self.postings.setdefault(token, []).append((position, frequency))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def with_source(self, source: str, text: str) -> "HotelIndex":
+        chunks = chunk_text(text)
+        if not chunks:
+            return self.without_source(source)
+        return HotelIndex(dict(self.sources, **{source: chunks}))
+
+    def without_source(self, source: str) -> "HotelIndex":
+        if source not in self.sources:
+            return self
+        sources = dict(self.sources)
+        del sources[source]
+        return HotelIndex(sources)
+
+    def search(self, query: str, k: int = KB_TOP_K) -> list:
+        """Returnează [(scor, fragment)] ordonate descrescător după scorul BM25."""
+        if not self.chunks:
+            return []
+        total = len(self.chunks)
+        scores = Counter()
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / self.avg_length)
+                scores[position] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return [(score, self.chunks[position]) for position, score in scores.most_common(k)]
+
+
+class KnowledgeBase:
+    """
+    Baza de cunoștințe per hotel (descriere + FAQ încărcate), indexată local cu BM25.
+    Indexul unui hotel se construiește la prima întrebare și se reconstruiește
+    doar pentru sursa modificată (descrierea sau un document).
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _build_from_db(self, hotel_id: int) -> HotelIndex:
+        if self.session_factory is None:
+            return HotelIndex()
+        sources = {}
+        db = self.session_factory()
+        try:
+            hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
+            if hotel and hotel.description:
+                sources["description"] = chunk_text(hotel.description)
+            documents = db.query(models.HotelDocument).filter(models.HotelDocument.hotel_id == hotel_id).all()
+            for document in documents:
+                sources[f"document:{document.id}"] = chunk_text(document.content)
+        finally:
+            db.close()
+        index = HotelIndex({source: chunks for source, chunks in sources.items() if chunks})
+        logging.info(f"[KB] Index construit pentru hotelul {hotel_id}: {len(index.chunks)} fragmente")
+        return index
+
+    def _get_index(self, hotel_id: int) -> HotelIndex:
+        with self._lock:
+            index = self._indexes.get(hotel_id)
+        if index is None:
+            index = self._build_from_db(hotel_id)
+            with self._lock:
+                self._indexes.setdefault(hotel_id, index)
+        return index
+
+    def update_source(self, hotel_id: int, source: str, text: Optional[str]):
+        """Actualizează o singură sursă (ex: 'description', 'document:3') a indexului unui hotel."""
+        with self._lock:
+            index = self._indexes.get(hotel_id)
+            if index is None:
+                # Indexul nu a fost încă construit - va fi citit complet la prima întrebare
+                if self.session_factory is not None:
+                    return
+                index = HotelIndex()
+            # Index nou înlocuit dintr-o dată: căutările în curs folosesc în continuare indexul vechi
+            self._indexes[hotel_id] = index.with_source(source, text) if text else index.without_source(source)
+
+    def drop_hotel(self, hotel_id: int):
+        with self._lock:
+            self._indexes.pop(hotel_id, None)
+
+    def retrieve(self, hotel_id: Optional[int], query: str, k: int = KB_TOP_K,
+                 token_budget: int = KB_TOKEN_BUDGET) -> list:
+        """Cele mai relevante fragmente pentru întrebare, în limita bugetului de tokeni."""
+        if hotel_id is None:
+            return []
+        selected = []
+        used = 0
+        for score, chunk in self._get_index(hotel_id).search(query, k):
+            cost = estimate_tokens(chunk)
+            if used + cost > token_budget:
+                continue
+            selected.append(chunk)
+            used += cost
+        return selected
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "indexed_hotels": len(self._indexes),
+                "chunks": sum(len(index.chunks) for index in self._indexes.values()),
+            }
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from langdetect import DetectorFactory, LangDetectException, detect_langs
+from langdetect.detector_factory import init_factory
+
+from ai_cache import normalize_message
+
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "ro")
+# Sub această lungime langdetect nu este de încredere, folosim dicționarul de mai jos
+SHORT_MESSAGE_CHARS = int(os.getenv("LANG_SHORT_MESSAGE_CHARS", 20))
+# Probabilitatea minimă pentru care considerăm detectarea sigură
+LANG_CONFIDENCE_THRESHOLD = float(os.getenv("LANG_CONFIDENCE_THRESHOLD", 0.90))
+LANG_MAX_REMEMBERED_PHONES = int(os.getenv("LANG_MAX_REMEMBERED_PHONES", 10000))
+
+# Mesaje scurte frecvente (normalizate, fără diacritice) și limba lor
+SHORT_MESSAGES = {
+    'ro': ["multumesc", "multumim", "mersi", "buna", "buna ziua", "buna seara", "salut", "da", "nu",
+           "sigur", "perfect multumesc", "multumesc frumos", "la revedere", "noapte buna"],
+    'en': ["thanks", "thank you", "thx", "hello", "hi", "yes", "no", "great", "thank you very much",
+           "good morning", "good evening", "see you", "bye", "cheers"],
+    'de': ["danke", "danke schon", "vielen dank", "hallo", "guten tag", "guten morgen", "guten abend",
+           "ja", "nein", "tschuss", "bis bald", "super danke"],
+    'fr': ["merci", "merci beaucoup", "bonjour", "bonsoir", "oui", "non", "salut merci", "au revoir"],
+    'es': ["gracias", "muchas gracias", "hola", "buenos dias", "buenas tardes", "buenas noches", "si", "adios"],
+    'it': ["grazie", "grazie mille", "ciao", "buongiorno", "buonasera", "arrivederci"],
+}
+_SHORT_MESSAGE_LANGUAGES = {text: lang for lang, texts in SHORT_MESSAGES.items() for text in texts}
+
+
+class LanguageDetector:
+    """
+    Serviciu de detectare a limbii: profilurile langdetect sunt încărcate la pornire,
+    rezultatele sunt deterministe și memorate, iar pentru fiecare telefon de oaspete
+    se reține ultima limbă detectată cu încredere.
+    """
+
+    def __init__(self, default_language: str = DEFAULT_LANGUAGE,
+                 max_remembered_phones: int = LANG_MAX_REMEMBERED_PHONES):
+        self.default_language = default_language
+        self.max_remembered_phones = max_remembered_phones
+        self._phone_languages = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def preload(self):
+        """Încarcă profilurile de limbă și fixează seed-ul pentru rezultate deterministe."""
+        if self._loaded:
+            return
+        DetectorFactory.seed = 0
+        init_factory()
+        self._loaded = True
+        logging.info("[LANG] Profilurile langdetect au fost încărcate")
+
+    def remembered_language(self, phone: Optional[str]) -> Optional[str]:
+        if not phone:
+            return None
+        with self._lock:
+            return self._phone_languages.get(phone)
+
+    def remember(self, phone: Optional[str], language: str):
+        if not phone:
+            return
+        with self._lock:
+            self._phone_languages[phone] = language
+            self._phone_languages.move_to_end(phone)
+            while len(self._phone_languages) > self.max_remembered_phones:
+                self._phone_languages.popitem(last=False)
+
+    def detect(self, text: str, phone: Optional[str] = None) -> str:
+        """
+        Detectează limba unui mesaj. Pentru mesaje scurte sau nesigure folosește
+        ultima limbă cunoscută a oaspetelui, apoi limba implicită.
+        """
+        normalized = normalize_message(text)
+        fallback = self.remembered_language(phone) or self.default_language
+
+        # Mesajele foarte scurte nu trec prin langdetect
+        if len(normalized) < SHORT_MESSAGE_CHARS:
+            language = _SHORT_MESSAGE_LANGUAGES.get(normalized)
+            if language:
+                self.remember(phone, language)
+                return language
+            if not normalized or (phone and self.remembered_language(phone)):
+                return fallback
+
+        self.preload()
+        language, probability = _detect_cached(text.strip())
+        if language is None:
+            logging.warning(f"[LANG] Detectare eșuată, folosim '{fallback}'")
+            return fallback
+        if probability >= LANG_CONFIDENCE_THRESHOLD:
+            self.remember(phone, language)
+            return language
+        # Detectare nesigură: preferăm limba cunoscută a oaspetelui, dacă există
+        return self.remembered_language(phone) or language
+
+    def stats(self) -> dict:
+        info = _detect_cached.cache_info()
+        return {
+            "loaded": self._loaded,
+            "remembered_phones": len(self._phone_languages),
+            "memo_hits": info.hits,
+            "memo_misses": info.misses,
+        }
+
+
+@lru_cache(maxsize=4096)
+def _detect_cached(text: str):
+    try:
+        candidates = detect_langs(text)
+    except LangDetectException:
+        return None, 0.0
+    if not candidates:
+        return None, 0.0
+    return candidates[0].lang, candidates[0].prob
+
+
+language_detector = LanguageDetector()
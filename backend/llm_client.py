@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from openai import APIError, APITimeoutError, AsyncOpenAI
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+# Permite folosirea unui server local în locul api.openai.com (teste, benchmark-uri)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 20))
+LLM_MAX_CONCURRENCY_PER_HOTEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_HOTEL", 5))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", 30))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_STREAM = os.getenv("LLM_STREAM", "false").lower() in ("1", "true", "yes")
+
+
+class LLMError(Exception):
+    """Eroare la generarea unui răspuns (API indisponibil, timeout, răspuns gol)."""
+
+
+class LLMClient:
+    """
+    Client asincron pentru OpenAI: reutilizează conexiunile HTTP, limitează numărul
+    de generări simultane (global și per hotel) și aplică un termen limită per apel.
+    """
+
+    def __init__(self, api_key: Optional[str] = OPENAI_API_KEY, model: str = OPENAI_MODEL,
+                 base_url: Optional[str] = OPENAI_BASE_URL, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_concurrency_per_hotel: int = LLM_MAX_CONCURRENCY_PER_HOTEL,
+                 deadline: float = LLM_DEADLINE_SECONDS, stream: bool = LLM_STREAM):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_hotel = max_concurrency_per_hotel
+        self.deadline = deadline
+        self.stream = stream
+        self._client = None
+        self._semaphore = None
+        self._hotel_semaphores = {}  # hotel_id -> (semafor, apeluri care îl folosesc); doar hotelurile active
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+        self.total_first_token = 0.0
+        self.streamed_calls = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _get_client(self) -> AsyncOpenAI:
+        # Clientul (și pool-ul httpx) se creează leneș, în bucla de evenimente curentă
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                timeout=self.deadline,
+            )
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                       http_client=http_client, max_retries=0)
+        return self._client
+
+    def _acquire_hotel_semaphore(self, hotel_id: Optional[int]) -> asyncio.Semaphore:
+        hotel_semaphore, users = self._hotel_semaphores.get(hotel_id, (None, 0))
+        if hotel_semaphore is None:
+            hotel_semaphore = asyncio.Semaphore(self.max_concurrency_per_hotel)
+        self._hotel_semaphores[hotel_id] = (hotel_semaphore, users + 1)
+        return hotel_semaphore
+
+    def _release_hotel_semaphore(self, hotel_id: Optional[int]):
+        # Semaforul dispare odată cu ultimul apel al hotelului, deci dicționarul nu crește la nesfârșit
+        hotel_semaphore, users = self._hotel_semaphores[hotel_id]
+        if users <= 1:
+            del self._hotel_semaphores[hotel_id]
+        else:
+            self._hotel_semaphores[hotel_id] = (hotel_semaphore, users - 1)
+
+    async def chat(self, messages: list, hotel_id: Optional[int] = None, temperature: float = 0.7,
+                   max_tokens: int = 500, deadline: Optional[float] = None, stream: Optional[bool] = None,
+                   on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> dict:
+        """
+        Trimite conversația la model și returnează {"content", "usage", "latency", "first_token_latency"}.
+        Termenul limită include și așteptarea unui loc liber la semafoare.
+        """
+        if not self.configured:
+            raise LLMError("OPENAI_API_KEY nu este setat")
+        stream = self.stream if stream is None else stream
+        try:
+            return await asyncio.wait_for(
+                self._chat(messages, hotel_id, temperature, max_tokens, stream, on_token),
+                timeout=deadline or self.deadline,
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMError(f"Termenul limită de {deadline or self.deadline}s a fost depășit")
+
+    async def _chat(self, messages, hotel_id, temperature, max_tokens, stream, on_token) -> dict:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        hotel_semaphore = self._acquire_hotel_semaphore(hotel_id)
+        try:
+            async with self._semaphore, hotel_semaphore:
+                return await self._call(messages, temperature, max_tokens, stream, on_token)
+        finally:
+            self._release_hotel_semaphore(hotel_id)
+
+    async def _call(self, messages, temperature, max_tokens, stream, on_token) -> dict:
+        self.in_flight += 1
+        self.calls += 1
+        started_at = time.monotonic()
+        try:
+            client = self._get_client()
+            if stream:
+                content, usage, first_token = await self._stream_completion(
+                    client, messages, temperature, max_tokens, on_token, started_at)
+            else:
+                response = await client.chat.completions.create(
+                    model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+                content = response.choices[0].message.content if response.choices else None
+                usage = {
+                    "prompt_tokens": response.usage.prompt_tokens,
+                    "completion_tokens": response.usage.completion_tokens,
+                    "total_tokens": response.usage.total_tokens,
+                } if response.usage else None
+                first_token = None
+        except (APIError, APITimeoutError, httpx.HTTPError) as e:
+            self.errors += 1
+            logging.error(f"[LLM] Eroare API: {str(e)}")
+            raise LLMError(str(e))
+        finally:
+            self.in_flight -= 1
+
+        latency = time.monotonic() - started_at
+        self.total_latency += latency
+        if not content or not content.strip():
+            self.errors += 1
+            raise LLMError("Răspuns gol de la model")
+        return {
+            "content": content.strip(),
+            "usage": usage,
+            "latency": latency,
+            "first_token_latency": first_token,
+        }
+
+    async def _stream_completion(self, client, messages, temperature, max_tokens, on_token, started_at):
+        stream = await client.chat.completions.create(
+            model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens, stream=True)
+        parts = []
+        first_token = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token is None:
+                    first_token = time.monotonic() - started_at
+                parts.append(delta)
+                if on_token is not None:
+                    await on_token(delta)
+            # Returnăm imediat ce modelul a terminat, fără să așteptăm închiderea conexiunii
+            if chunk.choices[0].finish_reason:
+                break
+        self.streamed_calls += 1
+        if first_token is not None:
+            self.total_first_token += first_token
+        # Răspunsurile în flux nu includ "usage" în această versiune a API-ului
+        return "".join(parts), None, first_token
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "base_url": self.base_url or "https://api.openai.com/v1",
+            "max_concurrency": self.max_concurrency,
+            "max_concurrency_per_hotel": self.max_concurrency_per_hotel,
+            "deadline_seconds": self.deadline,
+            "stream": self.stream,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "avg_latency_seconds": round(self.total_latency / self.calls, 3) if self.calls else 0.0,
+            "avg_first_token_seconds": round(self.total_first_token / self.streamed_calls, 3)
+            if self.streamed_calls else None,
+        }
+
+
+llm_client = LLMClient()
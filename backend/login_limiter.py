@@ -0,0 +1,115 @@
+import ipaddress
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+# Limite pentru încercările de autentificare (verificate înainte de orice lucru bcrypt);
+# per IP se numără doar încercările eșuate
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", 20))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", 5))
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", 300))
+# Numărul maxim de chei (IP-uri/email-uri) urmărite simultan
+LOGIN_LIMITER_MAX_KEYS = int(os.getenv("LOGIN_LIMITER_MAX_KEYS", 50000))
+# Proxy-urile (IP-uri sau rețele CIDR, separate prin virgulă) al căror X-Forwarded-For este crezut
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+
+
+def parse_networks(value: str) -> list:
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logging.error(f"[LOGIN-LIMIT] Adresă invalidă în TRUSTED_PROXIES: {item}")
+    return networks
+
+
+_trusted_proxies = parse_networks(TRUSTED_PROXIES)
+
+
+def is_trusted_proxy(host: str, networks: list = None) -> bool:
+    networks = _trusted_proxies if networks is None else networks
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def resolve_client_ip(peer: str, forwarded_for: str = None, networks: list = None) -> str:
+    """
+    IP-ul clientului: adresa conexiunii, iar dacă aceasta este un proxy de încredere,
+    prima adresă din X-Forwarded-For (de la dreapta) care nu este un proxy de încredere.
+    Valorile din stânga ei pot fi trimise de client și nu sunt folosite.
+    """
+    if not forwarded_for or not is_trusted_proxy(peer, networks):
+        return peer
+    for hop in reversed([hop.strip() for hop in forwarded_for.split(",") if hop.strip()]):
+        if not is_trusted_proxy(hop, networks):
+            return hop
+        peer = hop
+    return peer
+
+
+class AttemptLimiter:
+    """Fereastră glisantă de încercări per cheie (ex: 'ip:1.2.3.4', 'email:a@b.ro')."""
+
+    def __init__(self, window_seconds: int = LOGIN_WINDOW_SECONDS, max_keys: int = LOGIN_LIMITER_MAX_KEYS):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._attempts = OrderedDict()  # key -> deque de momente (time.monotonic)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _prune(self, key: str, now: float) -> deque:
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
+
+    def retry_after(self, key: str, limit: int) -> Optional[int]:
+        """Secundele de așteptare dacă cheia și-a atins limita, altfel None."""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._prune(key, now)
+            if attempts is None or len(attempts) < limit:
+                return None
+            self.rejected += 1
+            return max(1, int(attempts[0] + self.window_seconds - now) + 1)
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._prune(key, now)
+            if attempts is None:
+                attempts = self._attempts[key] = deque()
+            attempts.append(now)
+            self._attempts.move_to_end(key)
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracked_keys": len(self._attempts),
+                "window_seconds": self.window_seconds,
+                "rejected": self.rejected,
+            }
+
+
+login_limiter = AttemptLimiter()
@@ -1,29 +1,54 @@
-from fastapi import FastAPI, Request, Depends, HTTPException, status, BackgroundTasks, File, UploadFile, Form
+from fastapi import FastAPI, Request, Depends, HTTPException, status, BackgroundTasks, File, UploadFile, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from dotenv import load_dotenv
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
-import sqlite3
 import json
+import logging
 import os
 import secrets
+import time
 from datetime import datetime, timedelta
-from langdetect import detect, LangDetectException
+
+# Înainte de importurile locale: modulele citesc configurarea din mediu la import
+load_dotenv()
 
 # --- SQLAlchemy imports for hotel/room management ---
-from database import SessionLocal, init_db as sqlalchemy_init_db
+from database import AsyncBackedSession, SessionLocal, async_session, engine, init_db as sqlalchemy_init_db
 import models
 import schemas
 import crud
+import async_crud
 from sqlalchemy.orm import Session
-
-load_dotenv()
+from ai_cache import ai_response_cache, depersonalize, make_cache_key, personalize
+from language_detection import language_detector
+from llm_client import LLMError, llm_client
+from settings_service import SETTINGS_FILE, HotelSettings, SettingsStore
+from intents import LocalResponder
+from conversation_batcher import ConversationBatcher
+from knowledge_base import KnowledgeBase, estimate_tokens
+from message_export import EXPORT_MEDIA_TYPES, stream_export
+import message_rollup
+from message_retention import MESSAGE_RETENTION_INTERVAL_HOURS, run_retention
+import message_search
+from message_timeseries import GROUP_BY_COLUMNS, build_series, resolve_range, timeseries_cache
+from singleflight import SingleFlight
+from auth_cache import principal_cache
+from login_limiter import LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_MAX_FAILURES_PER_EMAIL, login_limiter, resolve_client_ip
+from password_hashing import PasswordHasherBusy, password_hasher
+from request_metrics import request_metrics
+from response_cache import hotel_tag, hotels_tag, response_cache, room_tag
+from room_import import RoomImportError, parse_records, read_body, validate_rooms
+from token_budget import AI_MAX_COMPLETION_TOKENS, AI_PROMPT_TOKEN_BUDGET, build_prompt, count_tokens
 
 app = FastAPI()
 
@@ -42,13 +67,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Ruta (șablonul de cale) pentru fiecare endpoint, folosită ca etichetă în metrici
+_route_paths = {}
+
+def route_label(request: Request) -> str:
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if not _route_paths:
+        for route in app.routes:
+            if hasattr(route, "endpoint"):
+                _route_paths[route.endpoint] = route.path
+    return f"{request.method} {_route_paths.get(endpoint, getattr(endpoint, '__name__', 'unknown'))}"
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    duration = time.perf_counter() - started
+    # get_current_user salvează în request.state durata autentificării
+    auth_duration = getattr(request.state, "auth_seconds", None)
+    request_metrics.record(route_label(request), duration, response.status_code, auth_duration)
+    timings = [f"app;dur={duration * 1000:.2f}"]
+    if auth_duration is not None:
+        timings.append(f"auth;dur={auth_duration * 1000:.2f}")
+    response.headers["Server-Timing"] = ", ".join(timings)
+    return response
+
 # JWT config
 SECRET_KEY = os.getenv("JWT_SECRET", secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 week
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: bcrypt rulează în pool-ul dedicat din password_hashing.py
 
 # OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
@@ -60,26 +111,24 @@ SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
 
-# DB init
-DB_FILE = "users.db"
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        email TEXT UNIQUE,
-        password TEXT,
-        confirmed INTEGER DEFAULT 0,
-        confirmation_token TEXT,
-        created_at TEXT
-    )''')
-    conn.commit()
-    conn.close()
-init_db()
-# Init SQLAlchemy DB for hotels/rooms
+# Init SQLAlchemy DB (utilizatori, hoteluri, camere)
+# Conturile vechi din users.db se copiază o singură dată cu migrate_users.py
 sqlalchemy_init_db()
-
-SETTINGS_FILE = "settings.json"
+# message_daily_rollup se actualizează la fiecare flush care atinge messages_sent
+message_rollup.install(SessionLocal)
+message_rollup.install(AsyncBackedSession)
+# Indexul full-text pentru /messages/search (FTS5 pe SQLite, GIN pe PostgreSQL)
+message_search.install(engine)
+
+# Setările globale sunt păstrate în memorie; valorile per hotel vin din baza de date
+settings_store = SettingsStore(SETTINGS_FILE)
+hotel_settings = HotelSettings(settings_store, SessionLocal)
+# Răspunsuri locale (fără OpenAI) pentru întrebările frecvente ale oaspeților
+local_responder = LocalResponder(SessionLocal)
+# Informațiile despre hotel (descriere + FAQ) indexate local pentru prompt
+knowledge_base = KnowledgeBase(SessionLocal)
+# Unifică generările AI identice aflate în curs simultan
+ai_singleflight = SingleFlight()
 
 # Global settings for controlling application state
 APP_ACTIVE = True  # Aplicația este întotdeauna activă
@@ -106,55 +155,85 @@ def send_confirmation_email(email: str, token: str):
         server.login(SMTP_USER, SMTP_PASSWORD)
         server.sendmail(SMTP_FROM, [email], msg.as_string())
 
+def user_to_dict(user: models.User) -> dict:
+    return {
+        "email": user.email,
+        "password": user.password,
+        "confirmed": bool(user.confirmed),
+        "confirmation_token": user.confirmation_token,
+    }
+
 def get_user(email: str):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT email, password, confirmed, confirmation_token FROM users WHERE email = ?", (email,))
-    row = c.fetchone()
-    conn.close()
-    if row:
-        return {"email": row[0], "password": row[1], "confirmed": row[2], "confirmation_token": row[3]}
-    return None
-
-def create_user(email: str, password: str, token: str):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO users (email, password, confirmation_token, created_at) VALUES (?, ?, ?, ?)",
-              (email, pwd_context.hash(password), token, datetime.utcnow().isoformat()))
-    conn.commit()
-    conn.close()
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_email(db, email)
+        return user_to_dict(user) if user else None
+    finally:
+        db.close()
+
+async def get_user_async(email: str):
+    async with async_session() as db:
+        user = await async_crud.get_user_by_email(db, email)
+        return user_to_dict(user) if user else None
+
+async def create_user(email: str, hashed_password: str, token: str):
+    async with async_session() as db:
+        await async_crud.create_user(db, email, hashed_password, token)
+
+async def set_user_password(email: str, hashed_password: str):
+    async with async_session() as db:
+        await async_crud.update_user_password(db, email, hashed_password)
+    principal_cache.invalidate_user(email)
 
 def confirm_user(token: str):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Verifică dacă token-ul există în baza de date
-    c.execute("SELECT email FROM users WHERE confirmation_token = ?", (token,))
-    user = c.fetchone()
+    db = SessionLocal()
+    try:
+        user = crud.confirm_user(db, token)
+        if not user:
+            print(f"DEBUG: Token-ul {token} nu a fost găsit în baza de date")
+            return None
+        print(f"DEBUG: Confirmare utilizator {user.email} - Status confirmare: {user.confirmed}")
+        principal_cache.invalidate_user(user.email)
+        return user_to_dict(user)
+    finally:
+        db.close()
+
+async def authenticate_user(email: str, password: str):
+    user = await get_user_async(email)
     if not user:
-        print(f"DEBUG: Token-ul {token} nu a fost găsit în baza de date")
-        conn.close()
         return False
-    
-    # Actualizează statusul de confirmare
-    c.execute("UPDATE users SET confirmed = 1 WHERE confirmation_token = ?", (token,))
-    rows_affected = c.rowcount
-    conn.commit()
-    
-    # Verifică dacă actualizarea a avut succes
-    c.execute("SELECT confirmed FROM users WHERE confirmation_token = ?", (token,))
-    confirmed_status = c.fetchone()
-    print(f"DEBUG: Confirmare utilizator {user[0]} - Rânduri afectate: {rows_affected}, Status confirmare: {confirmed_status}")
-    
-    conn.close()
-    return rows_affected > 0
-
-def authenticate_user(email: str, password: str):
-    user = get_user(email)
-    if not user or not pwd_context.verify(password, user["password"]):
+    valid, new_hash = await password_hasher.verify_and_update(password, user["password"])
+    if not valid:
         return False
+    if new_hash:
+        # Hash creat cu un cost bcrypt mai mic decât BCRYPT_ROUNDS - îl înlocuim
+        await set_user_password(email, new_hash)
     return user
 
+def client_ip(request: Request) -> str:
+    # În spatele proxy-ului (Render etc.) toate conexiunile vin de la proxy: vezi TRUSTED_PROXIES
+    peer = request.client.host if request.client else "unknown"
+    return resolve_client_ip(peer, request.headers.get("x-forwarded-for"))
+
+def enforce_attempt_limits(*limits):
+    """Refuză cererea (429) înainte de orice lucru bcrypt dacă o cheie și-a atins limita."""
+    for key, limit in limits:
+        retry_after = login_limiter.retry_after(key, limit)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Please try again later.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy. Please try again shortly."},
+        headers={"Retry-After": "1"},
+    )
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -164,7 +243,19 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    started = time.perf_counter()
+    try:
+        return resolve_principal(token)
+    finally:
+        request.state.auth_seconds = time.perf_counter() - started
+
+def resolve_principal(token: str) -> dict:
+    # Token deja validat recent: doar o căutare în dicționar
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -180,7 +271,10 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     user = get_user(email)
     if user is None or not user["confirmed"]:
         raise credentials_exception
-    return user
+    # Hash-ul parolei nu este păstrat în cache
+    principal = {key: value for key, value in user.items() if key != "password"}
+    principal_cache.set(token, principal, payload.get("exp"))
+    return principal
 
 class CalendarConfig(BaseModel):
     calendars: list[str]
@@ -191,15 +285,13 @@ class CalendarConfig(BaseModel):
 
 @app.get("/api/settings")
 def get_settings():
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE) as f:
-            return json.load(f)
-    return {}
+    return settings_store.get()
 
 @app.post("/api/settings")
 def save_settings(config: CalendarConfig):
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(config.dict(), f, indent=2)
+    settings_store.save(config.dict())
+    # Setările globale (ex: telefonul recepției) apar în răspunsurile AI salvate
+    ai_response_cache.clear()
     return {"ok": True}
 
 # --- User Management Endpoints ---
@@ -224,7 +316,9 @@ def forgot_password(data: dict):
     return {"msg": "Dacă există un cont cu acest email, vei primi un link de resetare."}
 
 @app.post("/reset-password")
-def reset_password(data: dict):
+async def reset_password(data: dict, request: Request):
+    ip_key = f"ip:{client_ip(request)}"
+    enforce_attempt_limits((ip_key, LOGIN_MAX_ATTEMPTS_PER_IP))
     token = data.get("token")
     new_password = data.get("password")
     if not token or not new_password:
@@ -233,34 +327,44 @@ def reset_password(data: dict):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
         pwreset = payload.get("pwreset")
-        if not email or not pwreset:
-            raise HTTPException(status_code=400, detail="Token invalid.")
     except JWTError:
+        login_limiter.hit(ip_key)
         raise HTTPException(status_code=400, detail="Token invalid sau expirat.")
+    if not email or not pwreset:
+        login_limiter.hit(ip_key)
+        raise HTTPException(status_code=400, detail="Token invalid.")
     # Setează parola nouă hash-uită
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("UPDATE users SET password = ? WHERE email = ?", (pwd_context.hash(new_password), email))
-    conn.commit()
-    conn.close()
+    hashed_password = await password_hasher.hash(new_password)
+    await set_user_password(email, hashed_password)
     return {"msg": "Parolă resetată cu succes. Poți face login cu noua parolă."}
 
 @app.post("/register")
-def register(user: User, background_tasks: BackgroundTasks):
-    if get_user(user.email):
+async def register(user: User, background_tasks: BackgroundTasks, request: Request):
+    ip_key = f"ip:{client_ip(request)}"
+    enforce_attempt_limits((ip_key, LOGIN_MAX_ATTEMPTS_PER_IP))
+    if await get_user_async(user.email):
+        login_limiter.hit(ip_key)
         raise HTTPException(status_code=400, detail="Email already registered")
     # generate confirmation token
     token = secrets.token_urlsafe(32)
-    create_user(user.email, user.password, token)
+    hashed_password = await password_hasher.hash(user.password)
+    await create_user(user.email, hashed_password, token)
     # send confirmation email
     background_tasks.add_task(send_confirmation_email, user.email, token)
     return {"msg": "Registration successful. Please check your email to confirm your account."}
 
 @app.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    ip_key = f"ip:{client_ip(request)}"
+    email_key = f"email:{form_data.username.strip().lower()}"
+    enforce_attempt_limits((ip_key, LOGIN_MAX_ATTEMPTS_PER_IP), (email_key, LOGIN_MAX_FAILURES_PER_EMAIL))
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
+        # Doar eșecurile se numără: login-urile reușite de pe același IP (ex: recepția) nu blochează
+        login_limiter.hit(ip_key)
+        login_limiter.hit(email_key)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    login_limiter.reset(email_key)
     if not user["confirmed"]:
         raise HTTPException(status_code=400, detail="Email not confirmed")
     access_token = create_access_token(data={"sub": user["email"]})
@@ -268,25 +372,13 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 @app.get("/confirm-email/{token}")
 def confirm_email(token: str):
-    user = None
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT email FROM users WHERE confirmation_token = ?", (token,))
-    row = c.fetchone()
-    if row:
-        user = row[0]
-    conn.close()
-    if not user:
+    # Căutare după confirmation_token (coloană indexată) și confirmare în aceeași sesiune
+    user_data = confirm_user(token)
+    if not user_data:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
-    
-    # Confirmă utilizatorul și verifică rezultatul
-    success = confirm_user(token)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to confirm account. Please try again.")
-    
+
     # Verifică dacă utilizatorul a fost confirmat cu succes
-    user_data = get_user(user)
-    if not user_data or not user_data["confirmed"]:
+    if not user_data["confirmed"]:
         raise HTTPException(status_code=500, detail="Account confirmation failed. Please contact support.")
     
     return {"msg": "Account confirmed. You can now log in."}
@@ -295,15 +387,13 @@ def confirm_email(token: str):
 
 @app.get("/api/settings")
 def get_settings(current_user: dict = Depends(get_current_user)):
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE) as f:
-            return json.load(f)
-    return {}
+    return settings_store.get()
 
 @app.post("/api/settings")
 def save_settings(config: CalendarConfig, current_user: dict = Depends(get_current_user)):
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(config.dict(), f, indent=2)
+    settings_store.save(config.dict())
+    # Setările globale (ex: telefonul recepției) apar în răspunsurile AI salvate
+    ai_response_cache.clear()
     return {"ok": True}
 
 # --- Hotel & Room Management Endpoints (SQLAlchemy) ---
@@ -315,6 +405,11 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Sesiunea pentru endpoint-urile `async def` - accesul la baza de date se face doar prin async_crud"""
+    async with async_session() as db:
+        yield db
+
 @app.post("/hotels", response_model=schemas.Hotel)
 def create_hotel(hotel: schemas.HotelCreate, db: Session = Depends(get_db)):
     try:
@@ -322,19 +417,50 @@ def create_hotel(hotel: schemas.HotelCreate, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-from sqlalchemy.orm import joinedload
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match: listă de ETag-uri separate prin virgulă sau "*"; comparație slabă (fără "W/")"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    """Răspuns JSON deja serializat, cu ETag; 304 dacă clientul are deja aceeași versiune"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_response(request: Request, tags: list, build) -> Response:
+    """
+    Servește răspunsul din response_cache sau îl construiește cu `build()` (obiecte
+    pydantic) și îl salvează. Invalidarea se face în funcțiile crud care modifică datele.
+    """
+    key = request.url.path + "?" + str(request.query_params)
+    versioned_key, cached = response_cache.lookup(key, tags)
+    if cached is None:
+        cached = response_cache.store(versioned_key, jsonable_encoder(build()))
+    return etag_response(request, *cached)
 
 @app.get("/hotels", response_model=list[schemas.Hotel])
-def list_hotels(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    hotels = db.query(models.Hotel).options(joinedload(models.Hotel.rooms)).offset(skip).limit(limit).all()
-    return hotels
+def list_hotels(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return cached_response(request, [hotels_tag()], lambda: [
+        schemas.Hotel.from_orm(hotel) for hotel in crud.get_hotels(db, skip=skip, limit=limit)
+    ])
 
 @app.get("/hotels/{hotel_id}", response_model=schemas.Hotel)
-def get_hotel(hotel_id: int, db: Session = Depends(get_db)):
-    hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
-    if not hotel:
-        raise HTTPException(status_code=404, detail="Hotel not found")
-    return hotel
+def get_hotel(request: Request, hotel_id: int, db: Session = Depends(get_db)):
+    def build():
+        hotel = crud.get_hotel_with_rooms(db, hotel_id)
+        if not hotel:
+            raise HTTPException(status_code=404, detail="Hotel not found")
+        return schemas.Hotel.from_orm(hotel)
+    return cached_response(request, [hotel_tag(hotel_id)], build)
 
 @app.post("/hotels/{hotel_id}/rooms", response_model=schemas.Room)
 def create_room(hotel_id: int, room: schemas.RoomCreate, db: Session = Depends(get_db)):
@@ -344,9 +470,31 @@ def create_room(hotel_id: int, room: schemas.RoomCreate, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="Hotel not found")
     return crud.create_room(db, room, hotel_id)
 
+@app.post("/hotels/{hotel_id}/rooms/bulk", status_code=201)
+async def bulk_create_rooms(hotel_id: int, request: Request, db=Depends(get_async_db)):
+    """
+    Import de camere: JSON (listă sau {"rooms": [...]}) ori CSV (Content-Type: text/csv,
+    coloane name,calendar_url,whatsapp_number,template_name). Toate rândurile sunt validate
+    înainte de salvare; dacă vreunul are erori nu se salvează nimic (422 cu erorile pe rând).
+    """
+    if not await async_crud.get_hotel_by_id(db, hotel_id):
+        raise HTTPException(status_code=404, detail="Hotel not found")
+    try:
+        body = await read_body(request.stream())
+        rooms, errors = validate_rooms(parse_records(body, request.headers.get("content-type", "")))
+    except RoomImportError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if errors:
+        return JSONResponse(status_code=422, content={"created": 0, "errors": errors})
+    created = await async_crud.bulk_create_rooms(db, hotel_id, rooms)
+    logging.info(f"[ROOMS] Import în masă pentru hotelul {hotel_id}: {created} camere")
+    return {"created": created, "errors": []}
+
 @app.get("/hotels/{hotel_id}/rooms", response_model=list[schemas.Room])
-def list_rooms(hotel_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_rooms(db, hotel_id, skip=skip, limit=limit)
+def list_rooms(request: Request, hotel_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return cached_response(request, [hotel_tag(hotel_id)], lambda: [
+        schemas.Room.from_orm(room) for room in crud.get_rooms(db, hotel_id, skip=skip, limit=limit)
+    ])
 
 # Endpointuri pentru preluare rezervări, generare mesaje și trimitere WhatsApp vor fi adăugate după ce finalizăm UI-ul.
 
@@ -356,13 +504,10 @@ def update_hotel(hotel_id: int, hotel_update: schemas.HotelUpdate, db: Session =
     db_hotel = crud.update_hotel(db, hotel_id, hotel_update)
     if not db_hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
-    return db_hotel
-
-@app.get("/hotels/{hotel_id}", response_model=schemas.Hotel)
-def get_hotel_by_id(hotel_id: int, db: Session = Depends(get_db)):
-    db_hotel = crud.get_hotel_by_id(db, hotel_id)
-    if not db_hotel:
-        raise HTTPException(status_code=404, detail="Hotel not found")
+    hotel_settings.invalidate(hotel_id)
+    if "description" in hotel_update.dict(exclude_unset=True):
+        knowledge_base.update_source(hotel_id, "description", db_hotel.description)
+    ai_response_cache.invalidate_hotel(hotel_id)
     return db_hotel
 
 @app.delete("/hotels/{hotel_id}")
@@ -370,6 +515,59 @@ def delete_hotel(hotel_id: int, db: Session = Depends(get_db)):
     ok = crud.delete_hotel(db, hotel_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Hotel not found")
+    hotel_settings.invalidate(hotel_id)
+    local_responder.invalidate(hotel_id)
+    knowledge_base.drop_hotel(hotel_id)
+    ai_response_cache.invalidate_hotel(hotel_id)
+    return {"ok": True}
+
+# --- Hotel Answers (răspunsuri predefinite pentru asistentul AI) ---
+@app.get("/hotels/{hotel_id}/answers", response_model=list[schemas.HotelAnswer])
+def list_hotel_answers(hotel_id: int, db: Session = Depends(get_db)):
+    return crud.get_hotel_answers(db, hotel_id)
+
+@app.put("/hotels/{hotel_id}/answers", response_model=schemas.HotelAnswer)
+def save_hotel_answer(hotel_id: int, answer: schemas.HotelAnswerCreate, db: Session = Depends(get_db)):
+    if not crud.get_hotel_by_id(db, hotel_id):
+        raise HTTPException(status_code=404, detail="Hotel not found")
+    db_answer = crud.upsert_hotel_answer(db, hotel_id, answer)
+    local_responder.invalidate(hotel_id)
+    return db_answer
+
+@app.delete("/hotels/{hotel_id}/answers/{answer_id}")
+def delete_hotel_answer(hotel_id: int, answer_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_hotel_answer(db, hotel_id, answer_id):
+        raise HTTPException(status_code=404, detail="Answer not found")
+    local_responder.invalidate(hotel_id)
+    return {"ok": True}
+
+# --- Hotel Documents (FAQ pentru asistentul AI) ---
+@app.get("/hotels/{hotel_id}/documents", response_model=list[schemas.HotelDocument])
+def list_hotel_documents(hotel_id: int, db: Session = Depends(get_db)):
+    return crud.get_hotel_documents(db, hotel_id)
+
+@app.post("/hotels/{hotel_id}/documents", response_model=schemas.HotelDocument)
+async def upload_hotel_document(hotel_id: int, file: UploadFile = File(...), db=Depends(get_async_db)):
+    """Încarcă un fișier text (FAQ) folosit de asistentul AI pentru a răspunde despre hotel"""
+    if not await async_crud.get_hotel_by_id(db, hotel_id):
+        raise HTTPException(status_code=404, detail="Hotel not found")
+    try:
+        content = (await file.read()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Documentul trebuie să fie un fișier text UTF-8")
+    if not content.strip():
+        raise HTTPException(status_code=400, detail="Documentul este gol")
+    db_document = await async_crud.create_hotel_document(db, hotel_id, file.filename, content)
+    knowledge_base.update_source(hotel_id, f"document:{db_document.id}", content)
+    ai_response_cache.invalidate_hotel(hotel_id)
+    return db_document
+
+@app.delete("/hotels/{hotel_id}/documents/{document_id}")
+def delete_hotel_document(hotel_id: int, document_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_hotel_document(db, hotel_id, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    knowledge_base.update_source(hotel_id, f"document:{document_id}", None)
+    ai_response_cache.invalidate_hotel(hotel_id)
     return {"ok": True}
 
 # --- Room PATCH/DELETE ---
@@ -388,23 +586,27 @@ def delete_room(room_id: int, db: Session = Depends(get_db)):
     return {"detail": "Room deleted"}
 
 @app.get("/rooms/{room_id}", response_model=schemas.Room)
-def get_room(room_id: int, db: Session = Depends(get_db)):
-    db_room = crud.get_room(db, room_id)
-    if not db_room:
-        raise HTTPException(status_code=404, detail="Room not found")
-    return db_room
-
-# --- Room Settings ---
-@app.get("/rooms/{room_id}/settings", response_model=schemas.RoomSettings)
-def get_room_settings(room_id: int, db: Session = Depends(get_db)):
-    db_settings = crud.get_room_settings(db, room_id)
-    if not db_settings:
-        # Dacă nu există setări, creăm unele implicite
+def get_room(request: Request, room_id: int, db: Session = Depends(get_db)):
+    def build():
         db_room = crud.get_room(db, room_id)
         if not db_room:
             raise HTTPException(status_code=404, detail="Room not found")
-        db_settings = crud.create_room_settings(db, schemas.RoomSettingsCreate(), room_id)
-    return db_settings
+        return schemas.Room.from_orm(db_room)
+    return cached_response(request, [room_tag(room_id)], build)
+
+# --- Room Settings ---
+@app.get("/rooms/{room_id}/settings", response_model=schemas.RoomSettings)
+def get_room_settings(request: Request, room_id: int, db: Session = Depends(get_db)):
+    def build():
+        db_settings = crud.get_room_settings(db, room_id)
+        if not db_settings:
+            # Dacă nu există setări, creăm unele implicite
+            db_room = crud.get_room(db, room_id)
+            if not db_room:
+                raise HTTPException(status_code=404, detail="Room not found")
+            db_settings = crud.create_room_settings(db, schemas.RoomSettingsCreate(), room_id)
+        return schemas.RoomSettings.from_orm(db_settings)
+    return cached_response(request, [room_tag(room_id)], build)
 
 @app.post("/rooms/{room_id}/settings", response_model=schemas.RoomSettings)
 def update_room_settings(room_id: int, settings: schemas.RoomSettingsUpdate, db: Session = Depends(get_db)):
@@ -430,7 +632,6 @@ def get_today_reservations(room_id: int, db: Session = Depends(get_db)):
 
 from fastapi import Body
 import requests
-import logging
 
 # Configurare logging
 logging.basicConfig(
@@ -953,7 +1154,7 @@ async def test_whatsapp_delivery():
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
 @app.post("/messages/bulk")
-async def send_bulk_messages(request: BulkMessageRequest, db: Session = Depends(get_db)):
+async def send_bulk_messages(request: BulkMessageRequest, db=Depends(get_async_db)):
     """Trimite mesaje în bulk către o listă de numere de telefon"""
     
     # Importăm modulele necesare
@@ -1118,7 +1319,7 @@ async def send_bulk_messages(request: BulkMessageRequest, db: Session = Depends(
             logging.info(f"[BULK] Headers WhatsApp: Authorization Bearer {WHATSAPP_TOKEN[:5]}...")
             
             logging.info(f"[BULK] Trimitere mesaj WhatsApp către {formatted_phone}")
-            response = requests.post(url, json=payload, headers=headers)
+            response = await run_in_threadpool(requests.post, url, json=payload, headers=headers)
             
             # Verificăm răspunsul
             logging.info(f"[BULK] Răspuns WhatsApp API: Status {response.status_code}, Body: {response.text}")
@@ -1127,17 +1328,15 @@ async def send_bulk_messages(request: BulkMessageRequest, db: Session = Depends(
                 logging.info(f"[BULK] Mesaj trimis cu succes către {formatted_phone} folosind template: {template_name}")
                 # Salvăm mesajul în baza de date
                 message_data = {
-                    "phone": formatted_phone,
                     "sent_date": datetime.now().strftime("%Y-%m-%d"),
-                    "sent_time": datetime.now().strftime("%H:%M:%S"),
+                    "sent_at": datetime.utcnow(),
                     "hotel_id": 1,  # Folosim un ID de hotel default
                     "room_id": 1,   # Folosim un ID de cameră default
                     "template_name": template_name,
                     "status": "sent",
-                    "content": f"Template: {template_name}",
-                    "is_ai_response": False
+                    "content": f"Template: {template_name}"
                 }
-                crud.create_message_sent(db, schemas.MessageSentCreate(**message_data))
+                await async_crud.create_message_sent(db, schemas.MessageSentCreate(**message_data))
                 
                 results.append({
                     "phone": formatted_phone,
@@ -1151,17 +1350,15 @@ async def send_bulk_messages(request: BulkMessageRequest, db: Session = Depends(
                 
                 # Salvăm mesajul eșuat în baza de date
                 message_data = {
-                    "phone": formatted_phone,
                     "sent_date": datetime.now().strftime("%Y-%m-%d"),
-                    "sent_time": datetime.now().strftime("%H:%M:%S"),
+                    "sent_at": datetime.utcnow(),
                     "hotel_id": 1,  # Folosim un ID de hotel default
                     "room_id": 1,   # Folosim un ID de cameră default
                     "template_name": template_name,
                     "status": "failed",
-                    "content": f"Failed to send template: {template_name}",
-                    "is_ai_response": False
+                    "content": f"Failed to send template: {template_name}"
                 }
-                crud.create_message_sent(db, schemas.MessageSentCreate(**message_data))
+                await async_crud.create_message_sent(db, schemas.MessageSentCreate(**message_data))
                 
                 results.append({
                     "phone": formatted_phone,
@@ -1176,17 +1373,15 @@ async def send_bulk_messages(request: BulkMessageRequest, db: Session = Depends(
             try:
                 # Salvăm mesajul eșuat în baza de date
                 message_data = {
-                    "phone": formatted_phone if 'formatted_phone' in locals() else phone_number,
                     "sent_date": datetime.now().strftime("%Y-%m-%d"),
-                    "sent_time": datetime.now().strftime("%H:%M:%S"),
+                    "sent_at": datetime.utcnow(),
                     "hotel_id": 1,  # Folosim un ID de hotel default
                     "room_id": 1,   # Folosim un ID de cameră default
                     "template_name": template_name,
                     "status": "failed",
-                    "content": f"Exception: {str(e)}",
-                    "is_ai_response": False
+                    "content": f"Exception: {str(e)}"
                 }
-                crud.create_message_sent(db, schemas.MessageSentCreate(**message_data))
+                await async_crud.create_message_sent(db, schemas.MessageSentCreate(**message_data))
             except Exception as db_error:
                 logging.error(f"[BULK] Failed to save error message to database: {str(db_error)}")
             
@@ -1453,56 +1648,133 @@ def send_manual_message(
 def create_message_sent(msg: schemas.MessageSentCreate, db: Session = Depends(get_db)):
     return crud.create_message_sent(db, msg)
 
-@app.get("/messages", response_model=list[schemas.MessageSent])
-def list_messages_sent(hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None, db: Session = Depends(get_db)):
-    return crud.list_messages_sent(db, hotel_id, room_id, start_date, end_date)
+MESSAGES_PAGE_MAX_LIMIT = 1000
+
+@app.get("/messages", response_model=schemas.MessageSentPage)
+def list_messages_sent(hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None,
+                       limit: int = 100, cursor: str = None, include_total: bool = False, db: Session = Depends(get_db)):
+    if limit < 1 or limit > MESSAGES_PAGE_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MESSAGES_PAGE_MAX_LIMIT}")
+    try:
+        items, next_cursor = crud.page_messages_sent(db, hotel_id, room_id, start_date, end_date, limit, cursor)
+        # Numărătoarea este o interogare separată, făcută doar când este cerută
+        total = crud.count_messages_sent(db, hotel_id, room_id, start_date, end_date) if include_total else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format or cursor.")
+    return {"items": items, "next_cursor": next_cursor, "total": total}
+
+MESSAGES_SEARCH_MAX_LIMIT = 100
+MESSAGES_SEARCH_MAX_OFFSET = 1000
+
+@app.get("/messages/search", response_model=schemas.MessageSearchPage)
+def search_messages(q: str, hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None,
+                    limit: int = 20, offset: int = 0, db: Session = Depends(get_db)):
+    """Căutare full-text în conținutul mesajelor, cele mai relevante primele"""
+    if limit < 1 or limit > MESSAGES_SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MESSAGES_SEARCH_MAX_LIMIT}")
+    if offset < 0 or offset > MESSAGES_SEARCH_MAX_OFFSET:
+        raise HTTPException(status_code=400, detail=f"offset must be between 0 and {MESSAGES_SEARCH_MAX_OFFSET}")
+    if not message_search.search_terms(q):
+        raise HTTPException(status_code=400, detail="q must contain at least one word")
+    try:
+        search_engine, rows, truncated = message_search.search_messages(db, q, hotel_id, room_id, start_date,
+                                                                        end_date, limit, offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD or ISO datetime.")
+    items = [
+        schemas.MessageSearchResult(**schemas.MessageSent.from_orm(message).dict(), score=score)
+        for message, score in rows
+    ]
+    return {"items": items, "engine": search_engine, "truncated": truncated}
+
+@app.get("/messages/export")
+def export_messages(format: str = "csv", hotel_id: int = None, room_id: int = None, start_date: str = None,
+                    end_date: str = None, include_archived: bool = False):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    # Datele se validează înainte de a începe transmiterea răspunsului
+    try:
+        for value, end in ((start_date, False), (end_date, True)):
+            if value:
+                crud.parse_date_bound(value, end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD or ISO datetime.")
+    filename = f"messages_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_export(SessionLocal, format, include_archived, hotel_id=hotel_id, room_id=room_id,
+                      start_date=start_date, end_date=end_date),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 # --- MessageSent Stats ---
 @app.get("/messages/stats")
 def messages_stats(hotel_id: int = None, start_date: str = None, end_date: str = None, db: Session = Depends(get_db)):
-    # Get hotel-level statistics
-    hotel_stats = crud.messages_stats(db, hotel_id, start_date, end_date)
-    
-    # Get room-level statistics
-    room_stats = crud.messages_stats_by_room(db, hotel_id, start_date, end_date)
-    
-    # Combine the results
-    result = []
-    
-    # Process hotel-level stats
-    for hotel_id_val, total in hotel_stats:
-        hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id_val).first()
-        if hotel:
-            result.append({
-                "hotel_id": hotel_id_val,
-                "hotel_name": hotel.name,
-                "room_id": None,  # None indicates hotel-wide stats
-                "room_name": "Toate camerele",  # "All rooms" in Romanian
-                "total_messages": total,
-                "start_date": start_date,
-                "end_date": end_date
-            })
-    
-    # Process room-level stats
-    for room_id_val, hotel_id_val, total in room_stats:
-        room = db.query(models.Room).filter(models.Room.id == room_id_val).first()
-        hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id_val).first()
-        if room and hotel:
-            result.append({
-                "hotel_id": hotel_id_val,
-                "hotel_name": hotel.name,
-                "room_id": room_id_val,
-                "room_name": room.name,
-                "total_messages": total,
-                "start_date": start_date,
-                "end_date": end_date
-            })
+    try:
+        # Totalurile pe hotel și pe cameră, cu nume, dintr-o singură interogare
+        result = crud.messages_stats_summary(db, hotel_id, start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD or ISO datetime.")
+    for row in result:
+        row["start_date"] = start_date
+        row["end_date"] = end_date
     
     # Sort by hotel name and then by room name (with hotel-wide stats first)
     result.sort(key=lambda x: (x["hotel_name"], x["room_id"] is not None, x.get("room_name", "")))
     
     return result
 
+@app.get("/messages/timeseries")
+def messages_timeseries(request: Request, hotel_id: int = None, room_id: int = None,
+                        start_date: str = Query(None, alias="from"), end_date: str = Query(None, alias="to"),
+                        bucket: str = "day", group_by: str = None, db: Session = Depends(get_db)):
+    """Serii dense (zero-filled) pe zi/săptămână/lună, calculate din message_daily_rollup"""
+    if group_by and group_by not in GROUP_BY_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUP_BY_COLUMNS)}")
+    try:
+        start, end = resolve_range(start_date, end_date, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+
+    cache_key = (hotel_id, room_id, start, end, bucket, group_by, message_rollup.version())
+    cached = timeseries_cache.get(cache_key)
+    if cached is None:
+        rows = crud.messages_timeseries(db, hotel_id, room_id, start.isoformat(), end.isoformat(),
+                                        GROUP_BY_COLUMNS.get(group_by))
+        cached = timeseries_cache.set(cache_key, build_series(rows, start, end, bucket, group_by))
+    return etag_response(request, *cached)
+
+@app.on_event('startup')
+def backfill_message_rollup():
+    """Populează message_daily_rollup din istoric dacă tabelul este încă gol"""
+    try:
+        message_rollup.rebuild_if_empty(SessionLocal)
+    except Exception as e:
+        logging.error(f"[ROLLUP] Eroare la popularea message_daily_rollup: {str(e)}")
+
+retention_task = None
+
+async def run_message_retention_periodically():
+    while True:
+        await asyncio.sleep(MESSAGE_RETENTION_INTERVAL_HOURS * 3600)
+        try:
+            results = await run_in_threadpool(run_retention, SessionLocal)
+            logging.info(f"[RETENTION] Arhivare periodică: {sum(results.values())} mesaje din {len(results)} hoteluri")
+        except Exception as e:
+            logging.error(f"[RETENTION] Eroare la arhivarea periodică: {str(e)}")
+
+@app.on_event('startup')
+async def start_message_retention():
+    """Arhivarea mesajelor vechi rulează periodic doar dacă MESSAGE_RETENTION_INTERVAL_HOURS > 0"""
+    global retention_task
+    if MESSAGE_RETENTION_INTERVAL_HOURS > 0:
+        retention_task = asyncio.create_task(run_message_retention_periodically())
+
+@app.on_event('shutdown')
+async def stop_message_retention():
+    if retention_task is not None:
+        retention_task.cancel()
+
 # --- Application Control ---
 
 # App is always active now, no need for state management endpoints
@@ -1512,28 +1784,27 @@ class AITestRequest(BaseModel):
     message: str
     phone: str = Field(default="+40123456789")
     guest_name: Optional[str] = Field(default="Turist")
+    hotel_id: Optional[int] = None
 
 class AIResponse(BaseModel):
     input_message: str
     ai_response: str
     detected_language: Optional[str] = None
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = "gpt-3.5-turbo"
-
-def detect_message_language(text: str) -> str:
+def detect_message_language(text: str, phone: Optional[str] = None) -> str:
     """
     Detectează limba unui text și returnează codul de limbă.
-    Returnează 'ro' (română) ca valoare implicită dacă detectarea eșuează.
+    Folosește ultima limbă cunoscută a oaspetelui (după telefon) pentru mesaje scurte
+    și 'ro' (română) ca valoare implicită dacă detectarea eșuează.
     """
-    try:
-        # Detectăm limba textului
-        lang = detect(text)
-        logging.info(f"[AI] Detected language: {lang}")
-        return lang
-    except LangDetectException as e:
-        logging.warning(f"[AI] Language detection failed, defaulting to Romanian: {str(e)}")
-        return 'ro'
+    lang = language_detector.detect(text, phone)
+    logging.info(f"[AI] Detected language: {lang}")
+    return lang
+
+@app.on_event('startup')
+def preload_language_detector():
+    """Încarcă profilurile de limbă la pornire, nu la primul mesaj"""
+    language_detector.preload()
 
 def get_system_prompt(language_code: str) -> str:
     """
@@ -1556,6 +1827,22 @@ def get_system_prompt(language_code: str) -> str:
     # Returnăm promptul pentru limba detectată sau română ca limbă implicită
     return prompts.get(language_code, prompts.get('en', prompts['ro']))
 
+def get_knowledge_prompt(language_code: str, chunks: list) -> str:
+    """
+    Returnează instrucțiunea cu informațiile despre hotel, în limba corespunzătoare.
+    Când avem aceste informații, asistentul le poate folosi în locul trimiterii la recepție.
+    """
+    intros = {
+        'ro': "Informații despre această proprietate (folosește-le când sunt relevante, nu inventa nimic în plus):",
+        'en': "Information about this property (use it when relevant, do not invent anything beyond it):",
+        'de': "Informationen zu dieser Unterkunft (verwenden Sie sie, wenn relevant, erfinden Sie nichts darüber hinaus):",
+        'fr': "Informations sur cet établissement (utilisez-les si pertinent, n'inventez rien d'autre) :",
+        'es': "Información sobre este alojamiento (úsala cuando sea relevante, no inventes nada más):",
+        'it': "Informazioni su questa struttura (usale quando pertinenti, non inventare nient'altro):"
+    }
+    intro = intros.get(language_code, intros['en'])
+    return intro + "\n" + "\n".join(f"- {chunk}" for chunk in chunks)
+
 def get_contact_message(language_code: str, phone: str) -> str:
     """
     Returnează mesajul de contact în limba corespunzătoare.
@@ -1572,148 +1859,219 @@ def get_contact_message(language_code: str, phone: str) -> str:
     # Returnăm mesajul pentru limba detectată sau engleză ca limbă implicită
     return messages.get(language_code, messages.get('en', messages['ro']))
 
-def generate_ai_response(message: str, guest_name: str = "Turist"):
+def get_fallback_response(language_code: str, guest_name: str, hotel_phone: str) -> str:
     """
-    Generează un răspuns AI folosind OpenAI GPT-3.5 Turbo.
-    Detectează automat limba mesajului și răspunde în aceeași limbă.
+    Răspuns de rezervă în limba detectată, folosit când modelul nu răspunde.
     """
-    # Definim un număr de telefon al hotelului pentru contact
-    hotel_phone = "0722 123 456"
+    fallback = get_contact_message(language_code, hotel_phone)
+    if language_code == 'ro':
+        return f"Bună ziua {guest_name}! Vă mulțumim pentru mesajul dumneavoastră. {fallback}"
+    elif language_code == 'de':
+        return f"Hallo {guest_name}! Vielen Dank für Ihre Nachricht. {fallback}"
+    else:
+        return f"Hello {guest_name}! Thank you for your message. {fallback}"
+
+def _reply(response: str, language: Optional[str], source: str, usage: Optional[dict] = None) -> dict:
+    return {"response": response, "language": language, "source": source, "usage": usage}
+
+async def generate_ai_reply(message: str, guest_name: str = "Turist", hotel_id: Optional[int] = None,
+                            language: Optional[str] = None, history: Optional[list] = None) -> dict:
+    """
+    Generează un răspuns AI folosind clientul OpenAI asincron (conexiuni reutilizate,
+    concurență limitată global și per hotel, termen limită per apel).
+    Răspunde în limba primită de la apelant (detectată o singură dată per mesaj);
+    dacă lipsește, o detectează aici.
+    Întrebările frecvente (mulțumiri, check-in, Wi-Fi, parcare, adresă) primesc întâi
+    răspunsul predefinit al hotelului; doar mesajele nerecunoscute ajung la OpenAI.
+    Răspunsurile reușite sunt păstrate în cache per hotel și limbă.
+    `history` conține replicile anterioare ale conversației (context limitat).
+    Returnează {"response", "language", "source", "usage"}; `usage` conține tokenii
+    și latența apelului OpenAI (None pentru răspunsurile locale sau din cache).
+    """
+    detected_lang = language
     
     try:
-        # Obținem numărul de telefon al hotelului din setări
-        settings_data = {}
-        try:
-            with open(SETTINGS_FILE, "r") as f:
-                settings_data = json.load(f)
-            hotel_phone = settings_data.get("hotel_phone", "0722 123 456")
-            if not hotel_phone:
-                hotel_phone = "0722 123 456"
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
-        
-        if not OPENAI_API_KEY:
-            logging.error("OPENAI_API_KEY nu este setat în environment!")
-            return "[Eroare: cheia OpenAI lipsă]"
+        # Telefonul recepției: din hotel (cache), apoi din setările globale din memorie.
+        # La prima cerere pentru un hotel, cache-urile citesc din baza de date - în pool-ul de fire
+        hotel_phone = await run_in_threadpool(hotel_settings.get_hotel_phone, hotel_id)
+        
+        # Detectăm limba mesajului primit doar dacă apelantul nu a făcut-o deja
+        if not detected_lang:
+            detected_lang = detect_message_language(message)
+        logging.info(f"[AI] Using language for message: {detected_lang}")
+        
+        # Primul nivel: clasificatorul local de intenții
+        local_response = await run_in_threadpool(
+            local_responder.respond, message, detected_lang, hotel_id, guest_name, hotel_phone,
+            expected_latency=llm_client.stats()["avg_latency_seconds"] or None
+        )
+        if local_response:
+            return _reply(local_response, detected_lang, "local")
         
-        # Detectăm limba mesajului primit
-        detected_lang = detect_message_language(message)
-        logging.info(f"[AI] Detected language for message: {detected_lang}")
+        # Verificăm dacă avem deja un răspuns pentru un mesaj identic
+        cached_response = ai_response_cache.get(message, detected_lang, hotel_id, guest_name)
+        if cached_response:
+            return _reply(cached_response, detected_lang, "cache")
+        
+        if not llm_client.configured:
+            logging.error("OPENAI_API_KEY nu este setat în environment!")
+            return _reply("[Eroare: cheia OpenAI lipsă]", detected_lang, "error")
         
         # Obținem promptul specific limbii detectate
         system_prompt = get_system_prompt(detected_lang)
         
+        # Cele mai relevante informații despre hotel (bugetul lor propriu: KB_TOKEN_BUDGET)
+        knowledge = await run_in_threadpool(knowledge_base.retrieve, hotel_id, message)
+        
         # Construim un prompt pentru asistentul hotelier în limba detectată
-        user_prompt = f"Un turist pe nume {guest_name} a răspuns la mesajul de check-in cu următorul text: \"{message}\". "
-        user_prompt += f"Răspunde-i într-un mod foarte prietenos, personal și profesionist. "
-        user_prompt += get_contact_message(detected_lang, hotel_phone)
+        def user_prompt(guest_message):
+            prompt = f"Un turist pe nume {guest_name} a răspuns la mesajul de check-in cu următorul text: \"{guest_message}\". "
+            prompt += f"Răspunde-i într-un mod foarte prietenos, personal și profesionist. "
+            return prompt + get_contact_message(detected_lang, hotel_phone)
         
-        # Construim mesajele pentru OpenAI
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        # Construim mesajele pentru OpenAI, tăiate la bugetul de tokeni al promptului
+        # (dacă e nevoie se scurtează doar textul turistului, nu și instrucțiunea)
+        messages, trimmed = build_prompt(
+            system_prompt, message, user_prompt,
+            knowledge=knowledge,
+            knowledge_prompt=lambda chunks: get_knowledge_prompt(detected_lang, chunks),
+            history=history
+        )
+        prompt_tokens_estimate = count_tokens(messages)
+        if any(trimmed.values()):
+            logging.info(f"[AI] Prompt tăiat la {AI_PROMPT_TOKEN_BUDGET} tokeni: {trimmed}")
         
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        logging.info(f"[AI] Sending request to OpenAI API")
+        logging.info(f"[AI] Using model: {llm_client.model}, language: {detected_lang}, ~{prompt_tokens_estimate} prompt tokens")
+        logging.debug(f"[AI] Payload: {json.dumps(messages, ensure_ascii=False)}")
         
-        payload = {
-            "model": OPENAI_MODEL,
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
+        # Apelurile concurente pentru același mesaj (hotel, limbă, text normalizat, context)
+        # împart o singură cerere OpenAI
+        coalescing_key = make_cache_key(message, detected_lang, hotel_id)
+        if history:
+            coalescing_key += "|" + json.dumps(history, ensure_ascii=False, sort_keys=True)
         
-        logging.info(f"[AI] Sending request to OpenAI API")
-        logging.info(f"[AI] Using model: {OPENAI_MODEL}")
-        logging.info(f"[AI] Using language: {detected_lang}")
-        logging.info(f"[AI] Payload: {json.dumps(payload, ensure_ascii=False)}")
-        
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        async def call_llm():
+            result = await llm_client.chat(messages, hotel_id=hotel_id, temperature=0.7,
+                                           max_tokens=AI_MAX_COMPLETION_TOKENS)
+            # Șablonul (numele liderului înlocuit cu marcajul) pentru cei care așteaptă același răspuns;
+            # None dacă numele nu poate fi înlocuit în siguranță
+            template = depersonalize(result["content"], guest_name, messages[0]["content"])
+            return result, guest_name, template
         
-        logging.info(f"[AI] Response status code: {response.status_code}")
+        try:
+            (result, leader_guest_name, template), shared = await ai_singleflight.do(coalescing_key, call_llm)
+            if shared and leader_guest_name != guest_name and template is None:
+                # Răspunsul liderului nu poate fi personalizat pentru acest oaspete - cerere proprie
+                logging.info(f"[AI] Răspunsul partajat nu poate fi personalizat, se face un apel separat")
+                (result, leader_guest_name, template), shared = await call_llm(), False
+        except LLMError as e:
+            logging.error(f"[AI] API error: {str(e)}")
+            return _reply(get_fallback_response(detected_lang, guest_name, hotel_phone), detected_lang, "fallback")
         
-        if response.status_code == 200:
-            # Procesăm răspunsul de la OpenAI
-            try:
-                response_json = response.json()
-                logging.info(f"[AI] Parsed JSON response: {response_json}")
-                
-                # Extragem răspunsul din formatul OpenAI
-                if "choices" in response_json and len(response_json["choices"]) > 0:
-                    ai_response = response_json["choices"][0]["message"]["content"].strip()
-                    logging.info(f"[AI] Extracted response: {ai_response}")
-                    return ai_response
-                else:
-                    logging.error(f"[AI] No choices in response: {response_json}")
-                    # Răspuns de rezervă în limba detectată
-                    fallback = get_contact_message(detected_lang, hotel_phone)
-                    if detected_lang == 'ro':
-                        return f"Bună ziua {guest_name}! Vă mulțumim pentru mesajul dumneavoastră. {fallback}"
-                    elif detected_lang == 'en':
-                        return f"Hello {guest_name}! Thank you for your message. {fallback}"
-                    elif detected_lang == 'de':
-                        return f"Hallo {guest_name}! Vielen Dank für Ihre Nachricht. {fallback}"
-                    else:
-                        return f"Hello {guest_name}! Thank you for your message. {fallback}"
-            except Exception as e:
-                logging.error(f"[AI] Error parsing response: {str(e)}")
-                # Răspuns de rezervă în limba detectată
-                fallback = get_contact_message(detected_lang, hotel_phone)
-                if detected_lang == 'ro':
-                    return f"Bună ziua {guest_name}! Vă mulțumim pentru mesajul dumneavoastră. {fallback}"
-                elif detected_lang == 'en':
-                    return f"Hello {guest_name}! Thank you for your message. {fallback}"
-                elif detected_lang == 'de':
-                    return f"Hallo {guest_name}! Vielen Dank für Ihre Nachricht. {fallback}"
-                else:
-                    return f"Hello {guest_name}! Thank you for your message. {fallback}"
-        else:
-            logging.error(f"[AI] API error: {response.status_code}, {response.text}")
-            # Răspuns de rezervă în limba detectată
-            fallback = get_contact_message(detected_lang, hotel_phone)
-            if detected_lang == 'ro':
-                return f"Bună ziua {guest_name}! Vă mulțumim pentru mesajul dumneavoastră. {fallback}"
-            elif detected_lang == 'en':
-                return f"Hello {guest_name}! Thank you for your message. {fallback}"
-            elif detected_lang == 'de':
-                return f"Hallo {guest_name}! Vielen Dank für Ihre Nachricht. {fallback}"
-            else:
-                return f"Hello {guest_name}! Thank you for your message. {fallback}"
+        ai_response = result["content"]
+        if shared:
+            # Răspunsul a fost generat pentru alt oaspete - completăm numele acestui oaspete
+            if leader_guest_name != guest_name:
+                ai_response = personalize(template, guest_name)
+            logging.info(f"[AI] Răspuns partajat cu un apel OpenAI identic aflat în curs")
+            return _reply(ai_response, detected_lang, "coalesced")
+        logging.info(f"[AI] Extracted response in {result['latency']:.2f}s: {ai_response}")
+        # Răspunsurile care depind de contextul conversației nu sunt refolosite
+        if not history:
+            ai_response_cache.set(message, detected_lang, ai_response, hotel_id, guest_name, result["latency"],
+                                  reserved_text=messages[0]["content"])
+        
+        # În modul streaming API-ul nu returnează "usage" - folosim estimarea
+        usage = result["usage"] or {
+            "prompt_tokens": prompt_tokens_estimate,
+            "completion_tokens": estimate_tokens(ai_response),
+            "total_tokens": prompt_tokens_estimate + estimate_tokens(ai_response),
+        }
+        usage.update({
+            "model": llm_client.model,
+            "prompt_chars": sum(len(m["content"]) for m in messages),
+            "latency_ms": int(result["latency"] * 1000),
+            "estimated": result["usage"] is None,
+        })
+        return _reply(ai_response, detected_lang, "llm", usage)
     except Exception as e:
         logging.error(f"[AI] Exception: {str(e)}")
         # Răspuns de rezervă politicos și neutru în caz de excepție
         try:
-            # Încercăm să detectăm limba chiar și în caz de eroare
-            detected_lang = detect_message_language(message)
+            # Folosim limba deja detectată; o detectăm doar dacă eroarea a apărut înainte
+            if not detected_lang:
+                detected_lang = detect_message_language(message)
             if detected_lang == 'ro':
-                return f"Bună ziua {guest_name}!\n\nVă mulțumim pentru mesajul dumneavoastră. Pentru orice informații suplimentare sau asistență directă, vă rugăm să contactați recepția hotelului.\n\nCu stimă,\nEchipa Hotelului"
-            elif detected_lang == 'en':
-                return f"Hello {guest_name}!\n\nThank you for your message. For any additional information or direct assistance, please contact the hotel reception.\n\nBest regards,\nThe Hotel Team"
+                fallback = f"Bună ziua {guest_name}!\n\nVă mulțumim pentru mesajul dumneavoastră. Pentru orice informații suplimentare sau asistență directă, vă rugăm să contactați recepția hotelului.\n\nCu stimă,\nEchipa Hotelului"
             elif detected_lang == 'de':
-                return f"Hallo {guest_name}!\n\nVielen Dank für Ihre Nachricht. Für weitere Informationen oder direkte Unterstützung wenden Sie sich bitte an die Hotelrezeption.\n\nMit freundlichen Grüßen,\nDas Hotelteam"
+                fallback = f"Hallo {guest_name}!\n\nVielen Dank für Ihre Nachricht. Für weitere Informationen oder direkte Unterstützung wenden Sie sich bitte an die Hotelrezeption.\n\nMit freundlichen Grüßen,\nDas Hotelteam"
             else:
-                return f"Hello {guest_name}!\n\nThank you for your message. For any additional information or direct assistance, please contact the hotel reception.\n\nBest regards,\nThe Hotel Team"
+                fallback = f"Hello {guest_name}!\n\nThank you for your message. For any additional information or direct assistance, please contact the hotel reception.\n\nBest regards,\nThe Hotel Team"
+            return _reply(fallback, detected_lang, "fallback")
         except:
             # Dacă totul eșuează, răspundem în engleză
-            return f"Hello {guest_name}!\n\nThank you for your message. For any additional information or direct assistance, please contact the hotel reception.\n\nBest regards,\nThe Hotel Team"
+            return _reply(f"Hello {guest_name}!\n\nThank you for your message. For any additional information or direct assistance, please contact the hotel reception.\n\nBest regards,\nThe Hotel Team", detected_lang, "fallback")
+
+async def generate_ai_response(message: str, guest_name: str = "Turist", hotel_id: Optional[int] = None,
+                               language: Optional[str] = None, history: Optional[list] = None) -> str:
+    """Varianta simplă a generate_ai_reply care returnează doar textul răspunsului."""
+    reply = await generate_ai_reply(message, guest_name, hotel_id, language, history)
+    return reply["response"]
+
+@app.get("/ai/usage")
+def ai_usage(group_by: str = "hotel", start_date: str = None, end_date: str = None, db: Session = Depends(get_db)):
+    """Consumul de tokeni și latența răspunsurilor AI, agregate per hotel sau per limbă"""
+    if group_by not in ("hotel", "language"):
+        raise HTTPException(status_code=400, detail="group_by trebuie să fie 'hotel' sau 'language'")
+    return crud.ai_usage_stats(db, group_by, start_date, end_date)
+
+@app.get("/ai/usage/latency-report")
+def ai_usage_latency_report(hotel_id: int = None, limit: int = 5000, db: Session = Depends(get_db)):
+    """Cum variază latența OpenAI în funcție de dimensiunea promptului"""
+    return crud.ai_latency_report(db, hotel_id, limit)
+
+@app.get("/ai/stats")
+def ai_stats():
+    """Statistici pentru componentele AI (cache răspunsuri, rata de hit, latență economisită)"""
+    return {
+        "cache": ai_response_cache.stats(),
+        "language_detection": language_detector.stats(),
+        "llm": llm_client.stats(),
+        "local_intents": local_responder.stats(),
+        "conversation_batching": conversation_batcher.stats(),
+        "knowledge_base": knowledge_base.stats(),
+        "coalescing": ai_singleflight.stats(),
+    }
+
+@app.get("/metrics/requests")
+def requests_metrics():
+    return {
+        "routes": request_metrics.stats(),
+        "auth_cache": principal_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "login_limiter": login_limiter.stats(),
+        "timeseries_cache": timeseries_cache.stats(),
+        "response_cache": response_cache.stats(),
+    }
+
+@app.on_event('shutdown')
+def shutdown_password_hasher():
+    password_hasher.shutdown()
+
+@app.on_event('shutdown')
+async def close_llm_client():
+    await llm_client.close()
 
 # Endpoint pentru testarea răspunsului AI
 @app.post("/test-ai-response", response_model=AIResponse)
-def test_ai_response(data: AITestRequest):
+async def test_ai_response(data: AITestRequest):
     try:
         # Detectăm limba mesajului
-        detected_lang = detect_message_language(data.message)
+        detected_lang = detect_message_language(data.message, data.phone)
         
         # Generează răspunsul în limba detectată
-        ai_response = generate_ai_response(data.message, data.guest_name)
+        ai_response = await generate_ai_response(data.message, data.guest_name, data.hotel_id, detected_lang)
         
         # Returnăm răspunsul și limba detectată
         return {
@@ -1725,6 +2083,55 @@ def test_ai_response(data: AITestRequest):
         logging.error(f"[AI-TEST] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Eroare la generarea răspunsului AI: {str(e)}")
         
+async def process_guest_messages(phone_number: str, guest_name: str, messages: list[str], history: list[dict]):
+    """
+    Răspunde unui grup de mesaje consecutive ale aceluiași oaspete: un singur apel AI,
+    un singur mesaj WhatsApp, apoi salvează mesajele primite și răspunsul în baza de date.
+    """
+    message_body = "\n".join(messages)
+    
+    # Detectăm limba mesajului
+    detected_lang = detect_message_language(message_body, phone_number)
+    logging.info(f"[WEBHOOK] Detected language for message: {detected_lang}")
+    
+    try:
+        # Căutăm camera după numărul de telefon (pentru hotel și salvarea mesajelor);
+        # sesiunea nu rămâne deschisă cât timp așteptăm răspunsul AI
+        async with async_session() as db:
+            room = await async_crud.get_room_by_whatsapp_number(db, phone_number)
+        
+        # Generăm un răspuns folosind AI în limba detectată
+        reply = await generate_ai_reply(
+            message_body, guest_name, room.hotel_id if room else None, detected_lang, history=history
+        )
+        ai_response = reply["response"]
+        
+        # Trimitem răspunsul înapoi prin WhatsApp
+        send_result = await run_in_threadpool(send_whatsapp_message, phone_number, ai_response)
+        logging.info(f"[WEBHOOK] Sent AI response to {phone_number} in language: {detected_lang}")
+        
+        # Salvăm mesajele primite și răspunsul AI în baza de date
+        if room:
+            async with async_session() as db:
+                await async_crud.save_guest_conversation(
+                    db, room.hotel_id, room.id, messages, ai_response, "sent" if send_result else "failed",
+                    reply["language"], reply["source"], reply["usage"]
+                )
+            
+            logging.info(f"[WEBHOOK] Saved {len(messages)} messages and AI response to database for room {room.id}")
+        else:
+            logging.warning(f"[WEBHOOK] Could not find room for phone number {phone_number}")
+        return ai_response
+    except Exception as e:
+        logging.error(f"[WEBHOOK] Error processing guest messages: {str(e)}")
+        return None
+
+conversation_batcher = ConversationBatcher(process_guest_messages)
+
+@app.on_event('shutdown')
+async def flush_pending_conversations():
+    await conversation_batcher.flush_all()
+
 @app.post("/whatsapp-webhook")
 async def whatsapp_webhook(request: Request):
     """Webhook pentru notificări WhatsApp"""
@@ -1761,58 +2168,8 @@ async def whatsapp_webhook(request: Request):
                             except Exception as e:
                                 logging.warning(f"[WEBHOOK] Could not extract guest name: {str(e)}")
                             
-                            # Detectăm limba mesajului
-                            detected_lang = detect_message_language(message_body)
-                            logging.info(f"[WEBHOOK] Detected language for message: {detected_lang}")
-                            
-                            # Generăm un răspuns folosind AI în limba detectată
-                            ai_response = generate_ai_response(message_body, guest_name)
-                            
-                            # Trimitem răspunsul înapoi prin WhatsApp
-                            send_result = send_whatsapp_message(phone_number, ai_response)
-                            
-                            # Salvăm mesajul primit și răspunsul AI în baza de date
-                            try:
-                                # Căutăm camera după numărul de telefon
-                                db = database.SessionLocal()
-                                room = db.query(models.Room).filter(models.Room.whatsapp_number == phone_number).first()
-                                
-                                if room:
-                                    # Salvăm mesajul primit de la utilizator
-                                    today = datetime.datetime.now().date().isoformat()
-                                    
-                                    # Mesajul primit
-                                    user_message = models.MessageSent(
-                                        hotel_id=room.hotel_id,
-                                        room_id=room.id,
-                                        sent_date=today,
-                                        template_name="RECEIVED_MESSAGE",
-                                        status="received",
-                                        content=message_body
-                                    )
-                                    db.add(user_message)
-                                    
-                                    # Răspunsul AI
-                                    ai_message = models.MessageSent(
-                                        hotel_id=room.hotel_id,
-                                        room_id=room.id,
-                                        sent_date=today,
-                                        template_name="AI_RESPONSE",
-                                        status="sent" if send_result else "failed",
-                                        content=ai_response
-                                    )
-                                    db.add(ai_message)
-                                    db.commit()
-                                    
-                                    logging.info(f"[WEBHOOK] Saved message and AI response to database for room {room.id}")
-                                else:
-                                    logging.warning(f"[WEBHOOK] Could not find room for phone number {phone_number}")
-                            except Exception as e:
-                                logging.error(f"[WEBHOOK] Error saving message to database: {str(e)}")
-                            finally:
-                                db.close()
-                            
-                            logging.info(f"[WEBHOOK] Sent AI response to {phone_number} in language: {detected_lang}")
+                            # Mesajele consecutive ale oaspetelui primesc un singur răspuns
+                            await conversation_batcher.add(phone_number, guest_name, message_body)
         
         return {"status": "success"}
     except Exception as e:
@@ -0,0 +1,98 @@
+import csv
+import heapq
+import io
+import json
+import os
+
+import crud
+import models
+from message_retention import iter_archived_files
+
+# Câte rânduri se citesc din baza de date la un pas (server-side cursor pe PostgreSQL)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
+
+EXPORT_COLUMNS = ("id", "hotel_id", "room_id", "sent_at", "sent_date", "template_name", "status", "content")
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",  # Starlette adaugă "; charset=utf-8"
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_message_rows(db, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                      end_date: str = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """Rândurile (tupluri simple, nu obiecte ORM) în ordine cronologică, citite în loturi."""
+    query = crud.query_messages_sent(db, hotel_id, room_id, start_date, end_date)
+    query = query.order_by(None).order_by(models.MessageSent.sent_at, models.MessageSent.id)
+    query = query.with_entities(*(getattr(models.MessageSent, column) for column in EXPORT_COLUMNS))
+    return query.yield_per(batch_size)
+
+
+def iter_archived_rows(db, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                       end_date: str = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """Mesajele arhivate (tabelul messages_sent_archive + fișierele NDJSON), în aceeași ordine și format."""
+    archive = models.MessageArchive
+    query = crud.query_archived_messages(db, hotel_id, room_id, start_date, end_date)
+    query = query.with_entities(*(getattr(archive, column) for column in EXPORT_COLUMNS))
+    return heapq.merge(
+        query.yield_per(batch_size),
+        iter_archived_files(hotel_id, room_id, start_date, end_date),
+        key=_row_order,
+    )
+
+
+def _row_order(row):
+    return row[3], row[0]  # (sent_at, id)
+
+
+def _format_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def iter_csv(rows, batch_size: int = EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_format_value(value) for value in row])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, batch_size: int = EXPORT_BATCH_SIZE):
+    lines = []
+    for row in rows:
+        record = {column: _format_value(value) for column, value in zip(EXPORT_COLUMNS, row)}
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+EXPORT_WRITERS = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+}
+
+
+def stream_export(session_factory, export_format: str, include_archived: bool = False, **filters):
+    """
+    Generator pentru StreamingResponse: deschide propria sesiune (rămâne deschisă
+    cât timp se trimite răspunsul) și produce fragmente de text, lot cu lot.
+    Cu `include_archived`, mesajele arhivate se intercalează cronologic, citite
+    printr-o a doua sesiune (două cursoare în flux nu pot împărți o conexiune MySQL).
+    """
+    sessions = [session_factory()]
+    try:
+        rows = iter_message_rows(sessions[0], **filters)
+        if include_archived:
+            sessions.append(session_factory())
+            rows = heapq.merge(iter_archived_rows(sessions[1], **filters), rows, key=_row_order)
+        yield from EXPORT_WRITERS[export_format](rows)
+    finally:
+        for db in sessions:
+            db.close()
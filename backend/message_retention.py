@@ -0,0 +1,275 @@
+"""
+Politica de retenție pentru messages_sent: pentru hotelurile cu `retention_months` setat,
+mesajele mai vechi de începutul lunii de acum N luni se mută în messages_sent_archive
+(implicit) sau în fișiere NDJSON comprimate (MESSAGE_ARCHIVE_TARGET=ndjson).
+
+Mutarea se face în loturi mici (MESSAGE_RETENTION_BATCH_SIZE), fiecare în propria
+tranzacție scurtă: se aleg id-urile cele mai vechi, se copiază, se șterg, commit. Astfel
+nu se blochează tabelul pentru scrierile noi cât timp rulează arhivarea.
+
+Rollup-ul (message_daily_rollup) nu se modifică: ștergerile în masă ocolesc evenimentele
+ORM, iar mesajele arhivate rămân în statistici. rebuild_rollup citește și arhiva din tabel
+(nu și fișierele NDJSON). Datele arhivate se pot exporta cu /messages/export?include_archived=true.
+
+    python message_retention.py run [--hotel-id 3] [--dry-run]
+"""
+import argparse
+import gzip
+import heapq
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, func, insert, literal, select, text
+
+import models
+
+MESSAGE_RETENTION_BATCH_SIZE = int(os.getenv("MESSAGE_RETENTION_BATCH_SIZE", 1000))
+# Pauză între loturi, ca celelalte scrieri (mai ales pe SQLite) să nu aștepte după arhivare
+MESSAGE_RETENTION_BATCH_PAUSE_MS = int(os.getenv("MESSAGE_RETENTION_BATCH_PAUSE_MS", 50))
+# 0 = arhivarea rulează doar din linia de comandă (cron); > 0 = și periodic, din aplicație
+MESSAGE_RETENTION_INTERVAL_HOURS = float(os.getenv("MESSAGE_RETENTION_INTERVAL_HOURS", 0))
+MESSAGE_ARCHIVE_TARGET = os.getenv("MESSAGE_ARCHIVE_TARGET", "table").lower()
+MESSAGE_ARCHIVE_DIR = os.getenv("MESSAGE_ARCHIVE_DIR", "message_archive")
+
+ARCHIVE_TARGETS = ("table", "ndjson")
+# Aceeași ordine ca EXPORT_COLUMNS din message_export
+ARCHIVE_COLUMNS = ("id", "hotel_id", "room_id", "sent_at", "sent_date", "template_name", "status", "content")
+
+if MESSAGE_ARCHIVE_TARGET not in ARCHIVE_TARGETS:
+    raise ValueError(f"MESSAGE_ARCHIVE_TARGET invalid: '{MESSAGE_ARCHIVE_TARGET}' (opțiuni: {', '.join(ARCHIVE_TARGETS)})")
+
+# Partițiile lunare create și confirmate (commit) în acest proces (doar PostgreSQL)
+_partitions = set()
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def retention_cutoff(retention_months: int, now: datetime = None) -> datetime:
+    """Începutul lunii de acum `retention_months` luni: tot ce e mai vechi se arhivează (luni întregi)."""
+    return add_months(month_start(now or datetime.utcnow()), -retention_months)
+
+
+def ensure_partitions(connection, first: datetime, last: datetime) -> set:
+    """
+    Pe PostgreSQL creează partițiile lunare ale arhivei care acoperă intervalul [first, last].
+    Returnează numele create în tranzacția curentă: DDL-ul se anulează la rollback, deci
+    apelantul le adaugă în _partitions abia după commit.
+    """
+    created = set()
+    if connection.dialect.name != "postgresql":
+        return created
+    table = models.MessageArchive.__tablename__
+    month = month_start(first)
+    while month <= last:
+        name = f"{table}_{month:%Y_%m}"
+        if name not in _partitions:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+            created.add(name)
+        month = add_months(month, 1)
+    return created
+
+
+def archive_path(hotel_id: int, month: datetime, archive_dir: str = None) -> str:
+    return os.path.join(archive_dir or MESSAGE_ARCHIVE_DIR, f"hotel_{hotel_id}", f"{month:%Y-%m}.ndjson.gz")
+
+
+def _format_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def write_ndjson(hotel_id: int, rows, archive_dir: str = None):
+    """Adaugă rândurile la fișierele lunare ale hotelului (membri gzip concatenați) și le sincronizează pe disc."""
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(month_start(row.sent_at), []).append(row)
+    for month, month_rows in by_month.items():
+        path = archive_path(hotel_id, month, archive_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lines = "".join(
+            json.dumps({column: _format_value(getattr(row, column)) for column in ARCHIVE_COLUMNS},
+                       ensure_ascii=False) + "\n"
+            for row in month_rows
+        )
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as archive_file:
+                archive_file.write(lines.encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def archive_batch(db, hotel_id: int, cutoff: datetime, batch_size: int = MESSAGE_RETENTION_BATCH_SIZE,
+                  target: str = MESSAGE_ARCHIVE_TARGET, archive_dir: str = None) -> int:
+    """Mută cel mult `batch_size` mesaje mai vechi de `cutoff`, într-o singură tranzacție. Returnează nr. mutat."""
+    msg = models.MessageSent
+    batch = (
+        db.query(msg.id, msg.sent_at)
+        .filter(msg.hotel_id == hotel_id, msg.sent_at < cutoff)
+        .order_by(msg.sent_at, msg.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not batch:
+        return 0
+    ids = [row.id for row in batch]
+    partitions = set()
+    try:
+        if target == "table":
+            partitions = ensure_partitions(db.connection(), batch[0].sent_at, batch[-1].sent_at)
+            columns = [getattr(msg, column) for column in ARCHIVE_COLUMNS]
+            db.execute(insert(models.MessageArchive.__table__).from_select(
+                list(ARCHIVE_COLUMNS) + ["archived_at"],
+                select(*columns, literal(datetime.utcnow(), DateTime)).where(msg.id.in_(ids)),
+            ))
+            rows = None
+        else:
+            rows = (
+                db.query(*(getattr(msg, column) for column in ARCHIVE_COLUMNS))
+                .filter(msg.id.in_(ids))
+                .order_by(msg.sent_at, msg.id)
+                .all()
+            )
+        # Statisticile AI rămân, doar legătura către mesajul mutat dispare
+        db.query(models.AIUsage).filter(models.AIUsage.message_id.in_(ids)).update(
+            {models.AIUsage.message_id: None}, synchronize_session=False
+        )
+        db.query(msg).filter(msg.id.in_(ids)).delete(synchronize_session=False)
+        if rows is not None:
+            # Fișierul se scrie înainte de commit: dacă scrierea eșuează, mesajele rămân în messages_sent
+            write_ndjson(hotel_id, rows, archive_dir)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _partitions.update(partitions)
+    return len(ids)
+
+
+def count_expired(db, hotel_id: int, cutoff: datetime) -> int:
+    msg = models.MessageSent
+    return db.query(func.count(msg.id)).filter(msg.hotel_id == hotel_id, msg.sent_at < cutoff).scalar()
+
+
+def archive_hotel(db, hotel: models.Hotel, now: datetime = None, batch_size: int = MESSAGE_RETENTION_BATCH_SIZE,
+                  target: str = MESSAGE_ARCHIVE_TARGET, pause_ms: int = MESSAGE_RETENTION_BATCH_PAUSE_MS,
+                  archive_dir: str = None) -> int:
+    """Arhivează toate mesajele expirate ale unui hotel, lot cu lot. Returnează numărul de mesaje mutate."""
+    cutoff = retention_cutoff(hotel.retention_months, now)
+    hotel_id = hotel.id
+    total = 0
+    while True:
+        moved = archive_batch(db, hotel_id, cutoff, batch_size, target, archive_dir)
+        total += moved
+        if moved < batch_size:
+            break
+        if pause_ms > 0:
+            time.sleep(pause_ms / 1000)
+    if total:
+        logging.info(f"[RETENTION] Hotel {hotel_id}: {total} mesaje mai vechi de {cutoff.date()} arhivate ({target})")
+    return total
+
+
+def run_retention(session_factory, now: datetime = None, hotel_id: int = None, **options) -> dict:
+    """Aplică politica pentru toate hotelurile cu retention_months (sau doar pentru `hotel_id`)."""
+    db = session_factory()
+    try:
+        query = db.query(models.Hotel).filter(models.Hotel.retention_months.isnot(None))
+        if hotel_id:
+            query = query.filter(models.Hotel.id == hotel_id)
+        hotels = query.order_by(models.Hotel.id).all()
+        db.commit()  # nu ținem tranzacția de citire deschisă între loturi
+        results = {}
+        for hotel in hotels:
+            try:
+                results[hotel.id] = archive_hotel(db, hotel, now, **options)
+            except Exception as e:
+                logging.error(f"[RETENTION] Eroare la arhivarea mesajelor pentru hotelul {hotel.id}: {str(e)}")
+        return results
+    finally:
+        db.close()
+
+
+def _archived_file_rows(hotel_dir: str, room_id: int = None, start=None, end=None, end_inclusive: bool = False):
+    for filename in sorted(os.listdir(hotel_dir)):
+        if not filename.endswith(".ndjson.gz"):
+            continue
+        month = datetime.strptime(filename[:7], "%Y-%m")
+        if (end is not None and month > end) or (start is not None and add_months(month, 1) <= start):
+            continue
+        with gzip.open(os.path.join(hotel_dir, filename), "rt", encoding="utf-8") as archive_file:
+            for line in archive_file:
+                record = json.loads(line)
+                sent_at = datetime.fromisoformat(record["sent_at"])
+                if room_id and record["room_id"] != room_id:
+                    continue
+                if start is not None and sent_at < start:
+                    continue
+                if end is not None and (sent_at > end if end_inclusive else sent_at >= end):
+                    continue
+                record["sent_at"] = sent_at
+                yield tuple(record[column] for column in ARCHIVE_COLUMNS)
+
+
+def iter_archived_files(hotel_id: int = None, room_id: int = None, start_date: str = None,
+                        end_date: str = None, archive_dir: str = None):
+    """Rândurile din fișierele NDJSON, în ordinea (sent_at, id), cu aceleași filtre ca exportul."""
+    import crud
+
+    archive_dir = archive_dir or MESSAGE_ARCHIVE_DIR
+    if not os.path.isdir(archive_dir):
+        return iter(())
+    start = crud.parse_date_bound(start_date) if start_date else None
+    end = crud.parse_date_bound(end_date, end=True) if end_date else None
+    end_inclusive = bool(end_date) and len(end_date) > 10
+    hotel_dirs = [f"hotel_{hotel_id}"] if hotel_id else sorted(os.listdir(archive_dir))
+    sources = [
+        _archived_file_rows(os.path.join(archive_dir, name), room_id, start, end, end_inclusive)
+        for name in hotel_dirs if os.path.isdir(os.path.join(archive_dir, name))
+    ]
+    return heapq.merge(*sources, key=lambda row: (row[3], row[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arhivarea mesajelor vechi (politica de retenție per hotel)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run = subparsers.add_parser("run", help="mută mesajele expirate în arhivă")
+    run.add_argument("--hotel-id", type=int, help="doar pentru acest hotel")
+    run.add_argument("--dry-run", action="store_true", help="afișează doar câte mesaje s-ar arhiva")
+    args = parser.parse_args()
+
+    from database import SessionLocal, init_db
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    init_db()
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            query = db.query(models.Hotel).filter(models.Hotel.retention_months.isnot(None))
+            if args.hotel_id:
+                query = query.filter(models.Hotel.id == args.hotel_id)
+            for hotel in query.order_by(models.Hotel.id):
+                cutoff = retention_cutoff(hotel.retention_months)
+                logging.info(f"[RETENTION] Hotel {hotel.id}: {count_expired(db, hotel.id, cutoff)} mesaje "
+                             f"mai vechi de {cutoff.date()}")
+        finally:
+            db.close()
+        return
+    started = time.perf_counter()
+    results = run_retention(SessionLocal, hotel_id=args.hotel_id)
+    logging.info(f"[RETENTION] Arhivare completă: {sum(results.values())} mesaje din {len(results)} hoteluri "
+                 f"în {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Întreținerea tabelului message_daily_rollup (număr de mesaje per zi, hotel, cameră,
+template și status). Rândurile se actualizează incremental la fiecare flush al unei
+sesiuni care adaugă, șterge sau modifică mesaje. Inserările în masă (bulk_insert_mappings,
+INSERT-uri directe) ocolesc evenimentele ORM - după ele se rulează reconstruirea:
+
+    python message_rollup.py rebuild [--start-date 2025-01-01] [--end-date 2025-01-31]
+"""
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, insert, select, union_all
+
+import models
+
+ROLLUP_KEY = ("day", "hotel_id", "room_id", "template_name", "status")
+
+# Crește după fiecare commit care a modificat rollup-ul în acest proces;
+# cache-urile construite din rollup îl includ în cheie
+_version = 0
+
+
+def version() -> int:
+    return _version
+
+
+def bump_version():
+    global _version
+    _version += 1
+
+
+def _message_key(message: models.MessageSent, committed: bool = False):
+    """Cheia din rollup pentru un mesaj; `committed` = valorile dinaintea modificărilor din sesiune."""
+    state = inspect(message)
+    values = {}
+    for attr in ("sent_at", "hotel_id", "room_id", "template_name", "status"):
+        value = getattr(message, attr)
+        if committed:
+            history = state.attrs[attr].history
+            if history.deleted:
+                value = history.deleted[0]
+        values[attr] = value
+    if values["sent_at"] is None or values["hotel_id"] is None or values["room_id"] is None:
+        return None
+    return (values["sent_at"].date(), values["hotel_id"], values["room_id"], values["template_name"], values["status"])
+
+
+def collect_deltas(session) -> Counter:
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, models.MessageSent):
+            if obj.sent_at is None:
+                # Fixăm momentul acum, ca ziua din rollup să fie aceeași cu cea salvată
+                obj.sent_at = datetime.utcnow()
+            deltas[_message_key(obj)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, models.MessageSent):
+            deltas[_message_key(obj, committed=True)] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, models.MessageSent) and session.is_modified(obj):
+            old_key = _message_key(obj, committed=True)
+            new_key = _message_key(obj)
+            if old_key != new_key:
+                deltas[old_key] -= 1
+                deltas[new_key] += 1
+    deltas.pop(None, None)
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+
+def _upsert(connection, rows: list):
+    table = models.MessageDailyRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={"message_count": table.c.message_count + statement.excluded.message_count},
+        )
+        connection.execute(statement)
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            message_count=table.c.message_count + statement.inserted.message_count
+        )
+        connection.execute(statement)
+    else:
+        for row in rows:
+            key_filter = [table.c[column] == row[column] for column in ROLLUP_KEY]
+            updated = connection.execute(
+                table.update().where(*key_filter).values(message_count=table.c.message_count + row["message_count"])
+            )
+            if not updated.rowcount:
+                connection.execute(table.insert().values(**row))
+
+
+def apply_deltas(connection, deltas: Counter):
+    if not deltas:
+        return
+    rows = [dict(zip(ROLLUP_KEY, key), message_count=delta) for key, delta in deltas.items()]
+    _upsert(connection, rows)
+    if any(delta < 0 for delta in deltas.values()):
+        table = models.MessageDailyRollup.__table__
+        connection.execute(table.delete().where(table.c.message_count <= 0))
+
+
+def _before_flush(session, flush_context, instances):
+    # Rollup-ul se scrie în aceeași tranzacție cu mesajele: commit sau rollback împreună
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+        session.info["rollup_changed"] = True
+
+
+def _after_commit(session):
+    if session.info.pop("rollup_changed", False):
+        bump_version()
+
+
+def _after_rollback(session):
+    session.info.pop("rollup_changed", None)
+
+
+def install(session_factory):
+    """Activează actualizarea incrementală pentru sesiunile create de `session_factory`."""
+    for name, listener in (("before_flush", _before_flush), ("after_commit", _after_commit),
+                           ("after_rollback", _after_rollback)):
+        if not event.contains(session_factory, name, listener):
+            event.listen(session_factory, name, listener)
+
+
+def rebuild_rollup(db, start_date: str = None, end_date: str = None) -> int:
+    """Recalculează rollup-ul din messages_sent + arhivă (tot sau doar zilele din interval). Returnează nr. de rânduri."""
+    import crud
+
+    rollup = models.MessageDailyRollup
+    msg = models.MessageSent
+    delete_query = db.query(rollup)
+    if start_date:
+        delete_query = delete_query.filter(rollup.day >= crud.parse_date_bound(start_date).date())
+    if end_date:
+        delete_query = delete_query.filter(rollup.day <= crud.parse_date_bound(end_date).date())
+    delete_query.delete(synchronize_session=False)
+
+    # Mesajele mutate în messages_sent_archive (message_retention.py) rămân în statistici
+    archive = models.MessageArchive
+    messages = union_all(
+        crud.filter_sent_at(select(msg.sent_at, msg.hotel_id, msg.room_id, msg.template_name, msg.status),
+                            start_date, end_date),
+        crud.filter_sent_at(select(archive.sent_at, archive.hotel_id, archive.room_id, archive.template_name,
+                                   archive.status), start_date, end_date, column=archive.sent_at),
+    ).subquery()
+    day = func.date(messages.c.sent_at)
+    source = select(day, messages.c.hotel_id, messages.c.room_id, messages.c.template_name, messages.c.status,
+                    func.count()).group_by(day, messages.c.hotel_id, messages.c.room_id,
+                                           messages.c.template_name, messages.c.status)
+    db.execute(insert(rollup.__table__).from_select(list(ROLLUP_KEY) + ["message_count"], source))
+    db.commit()
+    bump_version()
+    return db.query(func.count(rollup.id)).scalar()
+
+
+def rebuild_if_empty(session_factory):
+    """Prima pornire după introducerea tabelului: îl populăm din istoricul existent."""
+    db = session_factory()
+    try:
+        if db.query(models.MessageDailyRollup.id).first() is None and db.query(models.MessageSent.id).first() is not None:
+            rows = rebuild_rollup(db)
+            logging.info(f"[ROLLUP] Tabelul message_daily_rollup a fost populat: {rows} rânduri")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Întreținerea tabelului message_daily_rollup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="recalculează rollup-ul din messages_sent")
+    rebuild.add_argument("--start-date", help="prima zi (YYYY-MM-DD); implicit tot istoricul")
+    rebuild.add_argument("--end-date", help="ultima zi (YYYY-MM-DD), inclusiv")
+    args = parser.parse_args()
+
+    from database import SessionLocal, init_db
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    init_db()
+    db = SessionLocal()
+    try:
+        started = datetime.utcnow()
+        rows = rebuild_rollup(db, args.start_date, args.end_date)
+        logging.info(f"[ROLLUP] Reconstruire completă: {rows} rânduri în {(datetime.utcnow() - started).total_seconds():.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
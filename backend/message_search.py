@@ -0,0 +1,177 @@
+"""
+Căutare full-text în conținutul mesajelor (GET /messages/search?q=).
+
+- SQLite: tabel FTS5 cu conținut extern (messages_sent_fts, rowid = messages_sent.id),
+  ținut la zi de trigger-e la INSERT/UPDATE/DELETE - deci și pentru bulk_insert_mappings,
+  ștergerile din arhivare etc. Ordonare după bm25.
+- PostgreSQL: coloană generată content_tsv = to_tsvector('simple', content) (STORED) cu
+  index GIN, calculată automat la fiecare INSERT/UPDATE. Ordonare după ts_rank_cd.
+  Coloana și indexul se creează doar prin migrarea c3a8f41e6b90 (alembic upgrade); la pornire
+  se verifică doar existența lor, altfel căutarea folosește LIKE.
+- Altfel (MySQL sau SQLite fără FTS5): LIKE pe fiecare termen, fără scor, cele mai noi primele.
+
+Scorul se calculează doar pentru cele mai noi MESSAGE_SEARCH_MAX_CANDIDATES potriviri: un
+termen prezent în sute de mii de mesaje ar cere altfel câte un calcul bm25/ts_rank pe fiecare.
+Potrivirile mai vechi nu apar deloc în rezultate; în acest caz răspunsul are truncated=True,
+iar apelantul poate restrânge căutarea (hotel, cameră, interval de date).
+
+Căutarea acoperă doar messages_sent, nu și arhiva (message_retention.py).
+"""
+import logging
+import os
+import re
+
+from sqlalchemy import column, func, literal_column, table, text
+
+import crud
+import models
+
+# 0 = fără limită (scor pentru toate potrivirile)
+MESSAGE_SEARCH_MAX_CANDIDATES = int(os.getenv("MESSAGE_SEARCH_MAX_CANDIDATES", 3000))
+
+# Configurația text search PostgreSQL: 'simple' nu aplică stemming, potrivit pentru mesaje
+# în mai multe limbi. Trebuie să fie aceeași în index și în interogare.
+SEARCH_TS_CONFIG = "simple"
+FTS_TABLE = "messages_sent_fts"
+
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "content, content='messages_sent', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS messages_sent_fts_insert AFTER INSERT ON messages_sent BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS messages_sent_fts_delete AFTER DELETE ON messages_sent BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS messages_sent_fts_update AFTER UPDATE OF content ON messages_sent BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+)
+POSTGRES_TSV_COLUMN = "content_tsv"
+POSTGRES_TSV_INDEX = "ix_messages_sent_content_tsv"
+
+# Motorul de căutare per URL de bază de date, stabilit la install()
+_engines = {}
+
+_fts = table(FTS_TABLE, column("rowid"))
+_ts_vector = literal_column(f"messages_sent.{POSTGRES_TSV_COLUMN}")
+
+
+def search_terms(q: str) -> list:
+    """Cuvintele din textul căutat (litere/cifre Unicode); restul caracterelor sunt ignorate."""
+    return re.findall(r"\w+", q or "")
+
+
+def install(engine) -> str:
+    """
+    Alege motorul de căutare: 'fts5', 'tsvector' sau 'like'. Pe SQLite creează indexul FTS5 dacă
+    lipsește; pe PostgreSQL doar verifică dacă migrarea a creat coloana și indexul.
+    """
+    dialect = engine.dialect.name
+    search_engine = "like"
+    try:
+        if dialect == "sqlite":
+            with engine.begin() as connection:
+                existed = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+                ).first() is not None
+                for statement in SQLITE_FTS_DDL:
+                    connection.execute(text(statement))
+                if not existed:
+                    # Prima pornire: indexăm mesajele existente
+                    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                    logging.info(f"[MESSAGE-SEARCH] Indexul {FTS_TABLE} a fost construit din messages_sent")
+            search_engine = "fts5"
+        elif dialect == "postgresql":
+            # Fără DDL la pornire: ALTER TABLE pe messages_sent ar rescrie/bloca tabelul la fiecare worker
+            with engine.connect() as connection:
+                has_column = connection.execute(text(
+                    "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+                    "AND table_name = 'messages_sent' AND column_name = :column"
+                ), {"column": POSTGRES_TSV_COLUMN}).first() is not None
+                has_index = connection.execute(text(
+                    "SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() "
+                    "AND tablename = 'messages_sent' AND indexname = :index"
+                ), {"index": POSTGRES_TSV_INDEX}).first() is not None
+            if has_column and has_index:
+                search_engine = "tsvector"
+            else:
+                logging.warning(
+                    f"[MESSAGE-SEARCH] Lipsește {POSTGRES_TSV_COLUMN} sau {POSTGRES_TSV_INDEX} pe messages_sent "
+                    "(rulați alembic upgrade head) - se folosește LIKE"
+                )
+    except Exception as e:
+        # ex: SQLite compilat fără FTS5 - căutarea merge în continuare, cu LIKE
+        logging.error(f"[MESSAGE-SEARCH] Indexul full-text nu a putut fi creat sau verificat, se folosește LIKE: {str(e)}")
+    _engines[str(engine.url)] = search_engine
+    return search_engine
+
+
+def search_engine_for(db) -> str:
+    return _engines.get(str(db.get_bind().url), "like")
+
+
+def _filter(query, hotel_id: int = None, room_id: int = None, start_date: str = None, end_date: str = None):
+    msg = models.MessageSent
+    if hotel_id:
+        query = query.filter(msg.hotel_id == hotel_id)
+    if room_id:
+        query = query.filter(msg.room_id == room_id)
+    return crud.filter_sent_at(query, start_date, end_date)
+
+
+def _nth_newest(candidates, message_id, n: int):
+    """(id-ul celei de-a N-a cea mai nouă potriviri sau None, există potriviri mai vechi decât ea)."""
+    ids = [row[0] for row in candidates.order_by(message_id.desc()).offset(n - 1).limit(2)]
+    return (ids[0] if ids else None), len(ids) > 1
+
+
+def search_messages(db, q: str, hotel_id: int = None, room_id: int = None, start_date: str = None,
+                    end_date: str = None, limit: int = 50, offset: int = 0,
+                    max_candidates: int = MESSAGE_SEARCH_MAX_CANDIDATES):
+    """
+    Mesajele care conțin toți termenii din `q`, cele mai relevante primele.
+    Returnează (motor, [(MessageSent, scor)], trunchiat); scorul mai mare = mai relevant (None pentru LIKE).
+    `trunchiat` este True dacă potrivirile mai vechi decât cele mai noi `max_candidates` au fost excluse.
+    ValueError dacă `q` nu conține niciun cuvânt sau datele sunt greșite.
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise ValueError("q must contain at least one word")
+    msg = models.MessageSent
+    filters = (hotel_id, room_id, start_date, end_date)
+    search_engine = search_engine_for(db)
+    if search_engine == "like":
+        query = db.query(msg, literal_column("NULL").label("score"))
+        for term in terms:
+            query = query.filter(func.lower(msg.content).contains(term.lower(), autoescape=True))
+        query = _filter(query, *filters).order_by(msg.sent_at.desc(), msg.id.desc())
+        return search_engine, query.offset(offset).limit(limit).all(), False
+
+    if search_engine == "fts5":
+        # Fiecare termen între ghilimele: operatorii FTS5 din textul utilizatorului nu se interpretează
+        matches = text(f"{FTS_TABLE} MATCH :match").bindparams(match=" ".join('"' + term + '"' for term in terms))
+        bm25 = literal_column(f"bm25({FTS_TABLE})")
+        score, order = (-bm25).label("score"), bm25
+        message_id = _fts.c.rowid  # constrângerile pe rowid ajung direct în indexul FTS5
+        query = db.query(msg, score).join(_fts, _fts.c.rowid == msg.id).filter(matches)
+        candidates = db.query(message_id).filter(matches)
+        filtered_candidates = candidates.join(msg, msg.id == message_id)
+    else:
+        ts_query = func.plainto_tsquery(literal_column(f"'{SEARCH_TS_CONFIG}'::regconfig"), " ".join(terms))
+        matches = _ts_vector.op("@@")(ts_query)
+        rank = func.ts_rank_cd(_ts_vector, ts_query)
+        score, order = rank.label("score"), rank.desc()
+        message_id = msg.id
+        query = db.query(msg, score).filter(matches)
+        candidates = filtered_candidates = db.query(message_id).filter(matches)
+
+    truncated = False
+    if max_candidates > 0:
+        # id-ul celei de-a N-a cea mai nouă potriviri (id-urile cresc în timp): doar acestea primesc scor.
+        # Întâi fără filtre (doar indexul full-text): dacă termenii sunt rari, nu mai căutăm pragul filtrat.
+        threshold, truncated = _nth_newest(candidates, message_id, max_candidates)
+        if threshold is not None and any(value for value in filters):
+            threshold, truncated = _nth_newest(_filter(filtered_candidates, *filters), message_id, max_candidates)
+        if threshold is not None:
+            query = query.filter(message_id >= threshold)
+    query = _filter(query, *filters).order_by(order, msg.sent_at.desc(), msg.id.desc())
+    return search_engine, query.offset(offset).limit(limit).all(), truncated
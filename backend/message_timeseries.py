@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+BUCKETS = ("day", "week", "month")
+# Valoarea din query string -> coloana din message_daily_rollup
+GROUP_BY_COLUMNS = {
+    "status": "status",
+    "template": "template_name",
+}
+# Intervalul implicit (număr de intervale, inclusiv cel curent) când lipsesc from/to
+DEFAULT_BUCKET_COUNT = {"day": 30, "week": 12, "month": 12}
+# Limita de puncte pe serie, ca un interval greșit să nu producă răspunsuri uriașe
+TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", 1000))
+
+TIMESERIES_CACHE_TTL_SECONDS = int(os.getenv("TIMESERIES_CACHE_TTL_SECONDS", 60))
+TIMESERIES_CACHE_MAX_ENTRIES = int(os.getenv("TIMESERIES_CACHE_MAX_ENTRIES", 500))
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """Prima zi a intervalului: ziua însăși, lunea săptămânii sau prima zi a lunii."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day + timedelta(days=7)
+    if bucket == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_labels(start: date, end: date, bucket: str) -> list:
+    labels = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        labels.append(current)
+        current = next_bucket(current, bucket)
+    return labels
+
+
+def default_range(bucket: str, today: date = None):
+    """Ultimele DEFAULT_BUCKET_COUNT intervale, terminând cu ziua de azi (UTC)."""
+    end = today or datetime.utcnow().date()
+    start = bucket_start(end, bucket)
+    for _ in range(DEFAULT_BUCKET_COUNT[bucket] - 1):
+        start = bucket_start(start - timedelta(days=1), bucket)
+    return start, end
+
+
+def resolve_range(start_date: str = None, end_date: str = None, bucket: str = "day"):
+    """Validează parametrii și întoarce (prima zi, ultima zi). Ridică ValueError la date greșite."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    end = date.fromisoformat(end_date) if end_date else datetime.utcnow().date()
+    start = date.fromisoformat(start_date) if start_date else default_range(bucket, end)[0]
+    if start > end:
+        raise ValueError("from must not be after to")
+    if len(bucket_labels(start, end, bucket)) > TIMESERIES_MAX_POINTS:
+        raise ValueError(f"too many {bucket} buckets (max {TIMESERIES_MAX_POINTS})")
+    return start, end
+
+
+def build_series(rows, start: date, end: date, bucket: str, group_by: str = None) -> dict:
+    """
+    Transformă rândurile (zi, cheie, total) din rollup în serii dense: o valoare
+    pentru fiecare interval, 0 unde nu există mesaje.
+    """
+    labels = bucket_labels(start, end, bucket)
+    positions = {label: index for index, label in enumerate(labels)}
+    series = {}
+    for day, key, total in rows:
+        if isinstance(day, str):
+            day = date.fromisoformat(day[:10])
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * len(labels)
+        values[positions[bucket_start(day, bucket)]] += total
+    if not group_by:
+        series.setdefault(None, [0] * len(labels))
+    return {
+        "bucket": bucket,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "group_by": group_by,
+        "labels": [label.isoformat() for label in labels],
+        "series": [
+            {"key": "total" if not group_by else (key if key is not None else "unknown"), "values": values}
+            for key, values in sorted(series.items(), key=lambda item: (item[0] is None, str(item[0])))
+        ],
+    }
+
+
+class TimeseriesCache:
+    """
+    Cache LRU + TTL pentru răspunsurile /messages/timeseries. Cheia include versiunea
+    rollup-ului, deci orice mesaj nou salvat prin ORM face intrările vechi inaccesibile.
+    """
+
+    def __init__(self, max_entries: int = TIMESERIES_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = TIMESERIES_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (body, etag, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key, payload: dict) -> tuple:
+        """Serializează răspunsul o singură dată; întoarce (body, etag)."""
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[key] = (body, etag, time.time() + self.ttl_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+timeseries_cache = TimeseriesCache()
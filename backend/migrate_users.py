@@ -0,0 +1,69 @@
+import sqlite3
+import os
+import logging
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, engine
+from models import Base, User
+
+# Configurare logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Calea către vechea bază de date a utilizatorilor
+USERS_DB_PATH = os.getenv("USERS_DB_PATH", "./users.db")
+
+def migrate_users():
+    """
+    Copiază conturile din vechiul users.db (sqlite3) în tabelul users din baza
+    de date SQLAlchemy. Conturile care există deja (după email) sunt sărite,
+    așa că scriptul poate fi rulat de mai multe ori.
+    """
+    logger.info("Începere migrare utilizatori...")
+
+    if not os.path.exists(USERS_DB_PATH):
+        logger.info(f"{USERS_DB_PATH} nu există. Nu este nimic de migrat.")
+        return
+
+    # Creează tabelul users dacă nu există
+    Base.metadata.create_all(bind=engine, tables=[User.__table__])
+
+    conn = sqlite3.connect(USERS_DB_PATH)
+    cursor = conn.cursor()
+    session = SessionLocal()
+    copied = 0
+    skipped = 0
+
+    try:
+        cursor.execute("SELECT email, password, confirmed, confirmation_token, created_at FROM users")
+        rows = cursor.fetchall()
+        existing = {email for (email,) in session.query(User.email).all()}
+
+        for email, password, confirmed, confirmation_token, created_at in rows:
+            if not email or email in existing:
+                skipped += 1
+                continue
+            session.add(User(
+                email=email,
+                password=password,
+                confirmed=bool(confirmed),
+                confirmation_token=confirmation_token,
+                created_at=created_at or ""
+            ))
+            existing.add(email)
+            copied += 1
+
+        session.commit()
+        logger.info(f"Migrarea utilizatorilor a fost finalizată: {copied} copiați, {skipped} săriți.")
+
+    except IntegrityError as e:
+        session.rollback()
+        logger.error(f"Conflict la copierea utilizatorilor (rulează din nou scriptul): {str(e)}")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Eroare la migrarea utilizatorilor: {str(e)}")
+    finally:
+        session.close()
+        conn.close()
+
+if __name__ == "__main__":
+    migrate_users()
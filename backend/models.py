@@ -1,18 +1,44 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Text
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Text, Date, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
 class MessageSent(Base):
     __tablename__ = 'messages_sent'
+    # Filtrările după hotel/cameră + interval de timp folosesc indexurile compuse
+    __table_args__ = (
+        Index('ix_messages_sent_hotel_id_sent_at', 'hotel_id', 'sent_at'),
+        Index('ix_messages_sent_room_id_sent_at', 'room_id', 'sent_at'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     hotel_id = Column(Integer, ForeignKey('hotels.id'), nullable=False)
     room_id = Column(Integer, ForeignKey('rooms.id'), nullable=False)
-    sent_date = Column(String, nullable=False)  # ISO date string
+    sent_date = Column(String, nullable=False)  # ISO date string (păstrat pentru compatibilitate cu frontend-ul)
+    sent_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # momentul trimiterii (UTC)
     template_name = Column(String, nullable=False)
     status = Column(String, nullable=False)  # ex: 'sent', 'failed'
     content = Column(String, nullable=False)  # mesajul efectiv
 
+class MessageArchive(Base):
+    __tablename__ = 'messages_sent_archive'
+    # Mesajele mutate din messages_sent de politica de retenție (message_retention.py), cu același id.
+    # Pe PostgreSQL tabelul este partiționat pe luni după sent_at, deci sent_at face parte din cheia primară.
+    __table_args__ = (
+        Index('ix_messages_sent_archive_hotel_id_sent_at', 'hotel_id', 'sent_at'),
+        Index('ix_messages_sent_archive_room_id_sent_at', 'room_id', 'sent_at'),
+        {'postgresql_partition_by': 'RANGE (sent_at)'},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    sent_at = Column(DateTime, primary_key=True)
+    hotel_id = Column(Integer, nullable=False)
+    room_id = Column(Integer, nullable=False)
+    sent_date = Column(String, nullable=False)
+    template_name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    content = Column(String, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 class Hotel(Base):
     __tablename__ = 'hotels'
     id = Column(Integer, primary_key=True, index=True)
@@ -21,12 +47,13 @@ class Hotel(Base):
     phone = Column(String, nullable=True)
     email = Column(String, nullable=True)
     description = Column(Text, nullable=True)
-    rooms = relationship('Room', back_populates='hotel')
+    retention_months = Column(Integer, nullable=True)  # mesajele mai vechi se arhivează (NULL = păstrate mereu)
+    rooms = relationship('Room', back_populates='hotel', order_by='Room.id')
 
 class Room(Base):
     __tablename__ = 'rooms'
     id = Column(Integer, primary_key=True, index=True)
-    hotel_id = Column(Integer, ForeignKey('hotels.id'))
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), index=True)
     name = Column(String, nullable=False)
     calendar_url = Column(String, nullable=False)
     whatsapp_number = Column(String, nullable=True)  # Acum este opțional, se va prelua din API
@@ -41,3 +68,60 @@ class RoomSettings(Base):
     auto_send = Column(Boolean, default=True)  # Dacă se trimit mesaje automat
     send_time = Column(String, default='11:00:00')  # Ora la care se trimit mesajele (format HH:MM:SS)
     room = relationship('Room', back_populates='settings')
+
+class HotelAnswer(Base):
+    __tablename__ = 'hotel_answers'
+    __table_args__ = (UniqueConstraint('hotel_id', 'intent', 'language', name='uq_hotel_answers_intent_language'),)
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), nullable=False, index=True)
+    intent = Column(String, nullable=False)  # ex: 'checkin_time', 'wifi', 'parking'
+    language = Column(String, nullable=False)  # cod limbă: 'ro', 'en', 'de'...
+    answer = Column(Text, nullable=False)  # poate conține {guest_name} și {hotel_phone}
+
+class HotelDocument(Base):
+    __tablename__ = 'hotel_documents'
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    content = Column(Text, nullable=False)  # textul FAQ folosit de asistentul AI
+    uploaded_at = Column(String, nullable=False)  # ISO datetime string
+
+class AIUsage(Base):
+    __tablename__ = 'ai_usage'
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(Integer, ForeignKey('messages_sent.id'), nullable=True, unique=True)  # rândul AI_RESPONSE
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), nullable=True, index=True)
+    language = Column(String, nullable=True, index=True)
+    source = Column(String, nullable=False)  # 'llm', 'cache', 'local', 'fallback'
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    total_tokens = Column(Integer, default=0)
+    prompt_chars = Column(Integer, default=0)
+    latency_ms = Column(Integer, default=0)
+    estimated = Column(Boolean, default=False)  # tokeni estimați (răspuns în flux, fără "usage")
+    created_at = Column(String, nullable=False)  # ISO datetime string
+
+class User(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True, nullable=False)
+    password = Column(String, nullable=False)  # hash bcrypt
+    confirmed = Column(Boolean, default=False)
+    confirmation_token = Column(String, nullable=True, index=True)
+    created_at = Column(String, nullable=False)  # ISO datetime string
+
+class MessageDailyRollup(Base):
+    __tablename__ = 'message_daily_rollup'
+    # Un rând per zi + hotel + cameră + template + status; actualizat incremental (message_rollup.py)
+    __table_args__ = (
+        UniqueConstraint('day', 'hotel_id', 'room_id', 'template_name', 'status', name='uq_message_daily_rollup_key'),
+        Index('ix_message_daily_rollup_hotel_id_day', 'hotel_id', 'day'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)  # ziua (UTC) din sent_at
+    hotel_id = Column(Integer, ForeignKey('hotels.id'), nullable=False)
+    room_id = Column(Integer, ForeignKey('rooms.id'), nullable=False)
+    template_name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
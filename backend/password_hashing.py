@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Costul bcrypt pentru parolele noi; hash-urile mai slabe sunt refăcute la login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", min(4, os.cpu_count() or 1)))
+# Câte operații bcrypt pot aștepta în coadă înainte ca cererile să fie refuzate
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", 32))
+
+
+class PasswordHasherBusy(Exception):
+    """Coada de operații bcrypt este plină - cererea trebuie refuzată (503)."""
+
+
+class PasswordHasher:
+    """
+    Rulează hash-uirea și verificarea bcrypt într-un pool dedicat de fire de execuție,
+    în afara buclei de evenimente, cu o limită pentru operațiile aflate în așteptare.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = BCRYPT_WORKERS,
+                 max_pending: int = BCRYPT_MAX_PENDING):
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            # needs_update() semnalează hash-urile create cu un cost mai mic
+            bcrypt__min_rounds=rounds,
+        )
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    async def _run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Returnează (parolă corectă, hash nou dacă hash-ul existent trebuie refăcut)."""
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if valid and new_hash:
+            self.rehashed += 1
+            logging.info("[AUTH] Hash bcrypt refăcut cu costul curent")
+        return valid, new_hash
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import deque
+
+# Numărul de durate păstrate per rută pentru calculul percentilelor
+REQUEST_METRICS_SAMPLES = int(os.getenv("REQUEST_METRICS_SAMPLES", 1000))
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class _RouteMetrics:
+    def __init__(self, samples: int):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.auth_total = 0.0
+        self.auth_count = 0
+        self.durations = deque(maxlen=samples)
+
+
+class RequestMetrics:
+    """Durata cererilor HTTP per rută, inclusiv timpul petrecut în autentificare."""
+
+    def __init__(self, samples: int = REQUEST_METRICS_SAMPLES):
+        self.samples = samples
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, duration: float, status_code: int, auth_duration: float = None):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = _RouteMetrics(self.samples)
+            metrics.count += 1
+            metrics.total += duration
+            metrics.durations.append(duration)
+            if status_code >= 500:
+                metrics.errors += 1
+            if auth_duration is not None:
+                metrics.auth_count += 1
+                metrics.auth_total += auth_duration
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, metrics in self._routes.items():
+                durations = list(metrics.durations)
+                routes[route] = {
+                    "count": metrics.count,
+                    "errors": metrics.errors,
+                    "avg_ms": round(metrics.total / metrics.count * 1000, 3),
+                    "p50_ms": round(_percentile(durations, 50) * 1000, 3),
+                    "p95_ms": round(_percentile(durations, 95) * 1000, 3),
+                    "p99_ms": round(_percentile(durations, 99) * 1000, 3),
+                    "avg_auth_ms": round(metrics.auth_total / metrics.auth_count * 1000, 3)
+                    if metrics.auth_count else None,
+                }
+            return routes
+
+
+request_metrics = RequestMetrics()
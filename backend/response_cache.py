@@ -0,0 +1,239 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+# Configurare cache pentru răspunsurile GET de hoteluri și camere
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))
+# Gol = cache în memoria procesului; redis://host:6379/0 = cache comun pentru mai multe instanțe
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+
+
+def hotels_tag() -> str:
+    return "hotels"
+
+
+def hotel_tag(hotel_id: int) -> str:
+    return f"hotel:{hotel_id}"
+
+
+def room_tag(room_id: int) -> str:
+    return f"room:{room_id}"
+
+
+class MemoryBackend:
+    """Intrări LRU + TTL și versiunile etichetelor, în memoria procesului."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl_seconds: int):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, tags: list) -> list:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: list):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    async def abump(self, tags: list):
+        # Fără I/O - nu are rost să ocupăm un fir din pool
+        self.bump(tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Același contract ca MemoryBackend, pe Redis - versiunile cresc cu INCR, vizibil tuturor instanțelor."""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "response-cache:"):
+        import redis  # dependență opțională, necesară doar cu RESPONSE_CACHE_URL=redis://...
+
+        self._client = redis.Redis.from_url(url)
+        self.url = url
+        self._async_client = None  # redis.asyncio, creat la prima invalidare din cod async
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + "entry:" + key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: int):
+        self._client.set(self.prefix + "entry:" + key, value, ex=ttl_seconds)
+
+    def versions(self, tags: list) -> list:
+        values = self._client.mget([self.prefix + "tag:" + tag for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags: list):
+        pipeline = self._client.pipeline()
+        for tag in tags:
+            pipeline.incr(self.prefix + "tag:" + tag)
+        pipeline.execute()
+
+    async def abump(self, tags: list):
+        if self._async_client is None:
+            import redis.asyncio  # redis >= 4.2
+
+            self._async_client = redis.asyncio.Redis.from_url(self.url)
+        async with self._async_client.pipeline() as pipeline:
+            for tag in tags:
+                pipeline.incr(self.prefix + "tag:" + tag)
+            await pipeline.execute()
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+def make_backend(url: str = RESPONSE_CACHE_URL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend(max_entries)
+
+
+class ResponseCache:
+    """
+    Răspunsuri JSON serializate + ETag, pe chei de forma "cale?query". Fiecare intrare
+    depinde de una sau mai multe etichete (hotels, hotel:<id>, room:<id>) și este salvată
+    sub versiunea lor curentă. Funcțiile crud care modifică date cresc versiunea
+    etichetelor afectate, deci intrările vechi nu mai sunt găsite niciodată.
+    """
+
+    def __init__(self, backend=None, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend if backend is not None else make_backend()
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _versioned_key(self, key: str, tags: list) -> str:
+        versions = self.backend.versions(tags)
+        return key + "|" + ",".join(f"{tag}={version}" for tag, version in zip(tags, versions))
+
+    def lookup(self, key: str, tags: list):
+        """Returnează (cheia versionată, (body, etag) sau None). Cheia se folosește apoi la store()."""
+        if self.ttl_seconds <= 0:
+            return None, None
+        try:
+            versioned_key = self._versioned_key(key, tags)
+            value = self.backend.get(versioned_key)
+        except Exception as e:
+            # Cache-ul nu trebuie să oprească cererea - citim direct din baza de date
+            logging.error(f"[RESPONSE-CACHE] Eroare la citire: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return None, None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return versioned_key, None
+            self.hits += 1
+        etag, body = value.split(b"\n", 1)
+        return versioned_key, (body, etag.decode("ascii"))
+
+    def store(self, versioned_key: Optional[str], payload) -> tuple:
+        """Serializează răspunsul și îl salvează (dacă avem cheie); întoarce (body, etag)."""
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if versioned_key is not None:
+            try:
+                self.backend.set(versioned_key, etag.encode("ascii") + b"\n" + body, self.ttl_seconds)
+            except Exception as e:
+                logging.error(f"[RESPONSE-CACHE] Eroare la salvare: {str(e)}")
+                with self._lock:
+                    self.errors += 1
+        return body, etag
+
+    def invalidate(self, tags: Iterable[str]):
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            self._invalidation_failed(tags, e)
+            return
+        self._invalidated(tags)
+
+    async def ainvalidate(self, tags: Iterable[str]):
+        """Ca invalidate(), pentru codul async: cu Redis nu blochează bucla de evenimente."""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        try:
+            await self.backend.abump(tags)
+        except Exception as e:
+            self._invalidation_failed(tags, e)
+            return
+        self._invalidated(tags)
+
+    def _invalidation_failed(self, tags: list, error: Exception):
+        logging.error(f"[RESPONSE-CACHE] Eroare la invalidare {tags}: {str(error)}")
+        with self._lock:
+            self.errors += 1
+
+    def _invalidated(self, tags: list):
+        with self._lock:
+            self.invalidations += 1
+        logging.info(f"[RESPONSE-CACHE] Invalidare: {', '.join(tags)}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "entries": self.backend.size(),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import os
+
+from pydantic import ValidationError
+
+import schemas
+
+# Limite pentru POST /hotels/{hotel_id}/rooms/bulk
+ROOMS_BULK_MAX_ROWS = int(os.getenv("ROOMS_BULK_MAX_ROWS", 20000))
+ROOMS_BULK_MAX_BYTES = int(os.getenv("ROOMS_BULK_MAX_BYTES", 10 * 1024 * 1024))
+
+CSV_COLUMNS = ("name", "calendar_url", "whatsapp_number", "template_name")
+CSV_MEDIA_TYPES = ("text/csv", "application/csv", "text/plain")
+
+
+class RoomImportError(Exception):
+    """Cererea nu poate fi procesată deloc (format greșit, prea mare) - nu erori pe rând."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def read_body(chunks, max_bytes: int = ROOMS_BULK_MAX_BYTES) -> bytes:
+    """Citește corpul cererii bucată cu bucată și se oprește imediat ce depășește limita."""
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > max_bytes:
+            raise RoomImportError(f"Request body larger than {max_bytes} bytes", status_code=413)
+    return bytes(body)
+
+
+def parse_csv(body: bytes):
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise RoomImportError("CSV must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(text, newline=""))
+    columns = [column.strip() for column in reader.fieldnames or ()]
+    unknown = [column for column in columns if column not in CSV_COLUMNS]
+    if not columns or unknown:
+        raise RoomImportError(f"CSV header must use the columns: {', '.join(CSV_COLUMNS)}")
+    reader.fieldnames = columns
+    for record in reader:
+        # Celulele goale înseamnă "necompletat" (ex: whatsapp_number opțional)
+        yield {column: value.strip() for column, value in record.items()
+               if column in CSV_COLUMNS and value is not None and value.strip()}
+
+
+def parse_json(body: bytes):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise RoomImportError("Invalid JSON body")
+    if isinstance(data, dict):
+        data = data.get("rooms")
+    if not isinstance(data, list):
+        raise RoomImportError('JSON body must be a list of rooms or {"rooms": [...]}')
+    return data
+
+
+def parse_records(body: bytes, content_type: str = ""):
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return parse_csv(body) if media_type in CSV_MEDIA_TYPES else parse_json(body)
+
+
+def validate_rooms(records, max_rows: int = ROOMS_BULK_MAX_ROWS):
+    """
+    Validează toate rândurile (nu se oprește la prima eroare).
+    Returnează (camere valide, erori [{"row": n, "errors": [{"field", "message"}]}]), n pornind de la 1.
+    """
+    rooms = []
+    errors = []
+    for row, record in enumerate(records, 1):
+        if row > max_rows:
+            raise RoomImportError(f"Too many rooms (max {max_rows})", status_code=413)
+        if not isinstance(record, dict):
+            errors.append({"row": row, "errors": [{"field": None, "message": "room must be an object"}]})
+            continue
+        try:
+            rooms.append(schemas.RoomCreate(**record))
+        except ValidationError as e:
+            errors.append({"row": row, "errors": [
+                {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                for error in e.errors()
+            ]})
+    return rooms, errors
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+from pydantic import BaseModel, Field, root_validator
 from typing import Optional, List, Union
 
 class RoomBase(BaseModel):
@@ -22,7 +23,7 @@ class Room(RoomBase):
     settings: Optional['RoomSettings'] = None
     
     class Config:
-        from_attributes = True
+        orm_mode = True
 
 class RoomSettingsBase(BaseModel):
     auto_send: bool = True
@@ -40,7 +41,10 @@ class RoomSettings(RoomSettingsBase):
     room_id: int
     
     class Config:
-        from_attributes = True
+        orm_mode = True
+
+# Room.settings referă RoomSettings, definit după Room
+Room.update_forward_refs()
 
 class HotelBase(BaseModel):
     name: str
@@ -48,6 +52,7 @@ class HotelBase(BaseModel):
     phone: Optional[str] = None
     email: Optional[str] = None
     description: Optional[str] = None
+    retention_months: Optional[int] = Field(None, ge=1)  # None = mesajele nu se arhivează
 
 class HotelCreate(HotelBase):
     pass
@@ -58,28 +63,61 @@ class HotelUpdate(BaseModel):
     phone: Optional[str] = None
     email: Optional[str] = None
     description: Optional[str] = None
+    retention_months: Optional[int] = Field(None, ge=1)
 
 class Hotel(HotelBase):
     id: int
     rooms: Optional[List[Room]] = []
     class Config:
-        from_attributes = True
+        orm_mode = True
 
 class MessageSentBase(BaseModel):
     hotel_id: int
     room_id: int
     sent_date: str  # ISO date string
+    sent_at: Optional[datetime] = None  # completat din sent_date dacă lipsește
     template_name: str
     status: str
     content: str
 
 class MessageSentCreate(MessageSentBase):
-    pass
+    @root_validator(skip_on_failure=True)
+    def sent_at_matches_sent_date(cls, values):
+        # Filtrele, statisticile, rollup-ul și arhivarea folosesc sent_at, interfața afișează sent_date
+        try:
+            sent_day = datetime.strptime(values["sent_date"][:10], "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError("sent_date must be an ISO date (YYYY-MM-DD)")
+        sent_at = values.get("sent_at")
+        if sent_at is None:
+            now = datetime.utcnow()
+            # Mesajul de azi primește ora curentă; o dată din trecut primește 00:00, ca la migrarea sent_at
+            if sent_day in (now.date(), datetime.now().date()):
+                values["sent_at"] = now
+            else:
+                values["sent_at"] = datetime.combine(sent_day, datetime.min.time())
+        elif sent_at.date() != sent_day:
+            raise ValueError("sent_at and sent_date refer to different days")
+        return values
 
 class MessageSent(MessageSentBase):
     id: int
     class Config:
-        from_attributes = True
+        orm_mode = True
+
+class MessageSentPage(BaseModel):
+    items: List[MessageSent]
+    next_cursor: Optional[str] = None  # None = ultima pagină
+    total: Optional[int] = None  # calculat doar la cerere (include_total)
+
+class MessageSearchResult(MessageSent):
+    score: Optional[float] = None  # mai mare = mai relevant; None la căutarea cu LIKE
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchResult]
+    engine: str  # 'fts5', 'tsvector' sau 'like'
+    # True = au fost ordonate doar cele mai noi MESSAGE_SEARCH_MAX_CANDIDATES potriviri, cele mai vechi lipsesc
+    truncated: bool = False
 
 class MessageSentStats(BaseModel):
     hotel_id: int
@@ -91,7 +129,32 @@ class MessageSentStats(BaseModel):
     end_date: Optional[str] = None
     
     class Config:
-        from_attributes = True
+        orm_mode = True
+
+class HotelAnswerBase(BaseModel):
+    intent: str
+    language: str
+    answer: str
+
+class HotelAnswerCreate(HotelAnswerBase):
+    pass
+
+class HotelAnswer(HotelAnswerBase):
+    id: int
+    hotel_id: int
+
+    class Config:
+        orm_mode = True
+
+class HotelDocument(BaseModel):
+    id: int
+    hotel_id: int
+    filename: str
+    content: str
+    uploaded_at: str
+
+    class Config:
+        orm_mode = True
 
 class ReservationBase(BaseModel):
     guest_name: str
@@ -105,4 +168,4 @@ class Reservation(ReservationBase):
     room_id: int
     
     class Config:
-        from_attributes = True
+        orm_mode = True
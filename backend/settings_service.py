@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import models
+
+SETTINGS_FILE = "settings.json"
+DEFAULT_HOTEL_PHONE = "0722 123 456"
+# Cât de des verificăm mtime-ul fișierului (modificări făcute din afara aplicației)
+SETTINGS_CHECK_INTERVAL = float(os.getenv("SETTINGS_CHECK_INTERVAL", 5))
+HOTEL_SETTINGS_TTL = float(os.getenv("HOTEL_SETTINGS_TTL", 300))
+
+
+class SettingsStore:
+    """
+    Setările globale din settings.json, păstrate în memorie.
+    Fișierul este recitit doar dacă mtime-ul s-a schimbat, iar scrierea este atomică.
+    """
+
+    def __init__(self, path: str = SETTINGS_FILE, check_interval: float = SETTINGS_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._data = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self) -> dict:
+        """Returnează o copie a setărilor; pe calea caldă nu face I/O decât la expirarea intervalului."""
+        with self._lock:
+            now = time.monotonic()
+            if self._data is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                mtime = self._current_mtime()
+                if self._data is None or mtime != self._mtime:
+                    self._data = self._load()
+                    self._mtime = mtime
+            return dict(self._data)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            logging.info(f"[SETTINGS] Setări încărcate din {self.path}")
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logging.error(f"[SETTINGS] Fișier de setări invalid: {str(e)}")
+            return {}
+
+    def save(self, data: dict):
+        """Scrie setările într-un fișier temporar și îl înlocuiește atomic pe cel vechi."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".json")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp creează fișierul cu 0600 - păstrăm drepturile fișierului înlocuit
+                try:
+                    mode = stat.S_IMODE(os.stat(self.path).st_mode)
+                except FileNotFoundError:
+                    mode = 0o644
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._data = dict(data)
+            self._mtime = self._current_mtime()
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+
+class HotelSettings:
+    """
+    Valori specifice hotelului (ex: telefonul recepției) citite din baza de date
+    și păstrate în memorie; setările globale sunt folosite doar ca rezervă.
+    """
+
+    def __init__(self, store: SettingsStore, session_factory, ttl: float = HOTEL_SETTINGS_TTL):
+        self.store = store
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._phones = {}  # hotel_id -> (phone, loaded_at)
+        self._lock = threading.Lock()
+
+    def _hotel_phone_from_db(self, hotel_id: int) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            row = db.query(models.Hotel.phone).filter(models.Hotel.id == hotel_id).first()
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    def get_hotel_phone(self, hotel_id: Optional[int] = None) -> str:
+        phone = None
+        if hotel_id is not None:
+            with self._lock:
+                cached = self._phones.get(hotel_id)
+            if cached and time.monotonic() - cached[1] < self.ttl:
+                phone = cached[0]
+            else:
+                try:
+                    phone = self._hotel_phone_from_db(hotel_id)
+                except Exception as e:
+                    # Eroarea nu se păstrează în cache: următorul apel citește din nou baza de date;
+                    # până atunci folosim valoarea expirată, dacă o avem
+                    logging.error(f"[SETTINGS] Eroare la citirea telefonului pentru hotelul {hotel_id}: {str(e)}")
+                    phone = cached[0] if cached else None
+                else:
+                    with self._lock:
+                        self._phones[hotel_id] = (phone, time.monotonic())
+        return phone or self.store.get().get("hotel_phone") or DEFAULT_HOTEL_PHONE
+
+    def invalidate(self, hotel_id: Optional[int] = None):
+        with self._lock:
+            if hotel_id is None:
+                self._phones.clear()
+            else:
+                self._phones.pop(hotel_id, None)
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Awaitable, Callable, Tuple
+
+
+class LeaderCancelled(Exception):
+    """Liderul a fost anulat înainte de a obține rezultatul; cei care așteaptă reîncearcă."""
+
+
+class SingleFlight:
+    """
+    Unifică apelurile concurente identice: primul apel (liderul) execută operația,
+    iar apelurile cu aceeași cheie sosite între timp așteaptă și primesc același rezultat.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, operation: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Returnează (rezultat, partajat) - `partajat` este True pentru apelurile unificate."""
+        future = self._in_flight.get(key)
+        while future is not None:
+            self.coalesced += 1
+            try:
+                # shield: anularea unui apel care așteaptă nu anulează operația liderului
+                return await asyncio.shield(future), True
+            except LeaderCancelled:
+                # Primul care se trezește devine noul lider, ceilalți îl așteaptă pe acesta
+                self.coalesced -= 1
+                future = self._in_flight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.leaders += 1
+        try:
+            result = await operation()
+        except asyncio.CancelledError:
+            # Nu propagăm CancelledError (BaseException) celor care așteaptă: ar ocoli
+            # tratarea erorilor (except Exception) din apelanți
+            future.set_exception(LeaderCancelled(key))
+            future.exception()
+            raise
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Excepția este preluată de cei care așteaptă; evităm avertismentul "never retrieved"
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced_calls": self.coalesced,
+        }
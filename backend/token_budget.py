@@ -0,0 +1,68 @@
+import os
+
+from knowledge_base import estimate_tokens
+
+# Bugetul total de tokeni pentru prompt (sistem + context + mesajul oaspetelui)
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", 1500))
+AI_MAX_COMPLETION_TOKENS = int(os.getenv("AI_MAX_COMPLETION_TOKENS", 500))
+# Tokeni adăugați de API pentru fiecare mesaj din conversație (rol, separatori)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Din mesajul oaspetelui se păstrează cel puțin atâtea caractere, chiar dacă promptul depășește bugetul
+AI_MIN_GUEST_MESSAGE_CHARS = int(os.getenv("AI_MIN_GUEST_MESSAGE_CHARS", 200))
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def count_tokens(messages: list) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def truncate_message(message: str, keep: int) -> str:
+    """Începutul mesajului, tăiat la `keep` caractere (inclusiv "…")."""
+    if len(message) <= keep:
+        return message
+    return message[:max(keep - 1, 0)].rstrip() + "…"
+
+
+def build_prompt(system_prompt: str, guest_message: str, user_prompt, knowledge: list = None,
+                 knowledge_prompt=None, history: list = None, budget: int = AI_PROMPT_TOKEN_BUDGET,
+                 min_guest_chars: int = AI_MIN_GUEST_MESSAGE_CHARS):
+    """
+    Construiește mesajele pentru model în limita bugetului de tokeni.
+    `user_prompt(mesaj)` întoarce textul pentru rolul user (instrucțiunea, linia de contact etc.)
+    în jurul mesajului oaspetelui.
+    Ordinea renunțărilor: replicile cele mai vechi din istoric, apoi fragmentele
+    de cunoștințe cele mai puțin relevante, iar la final se scurtează doar mesajul oaspetelui
+    (se păstrează începutul, cel puțin `min_guest_chars` caractere); instrucțiunea rămâne întreagă.
+    Returnează (mesaje, informații despre ce s-a tăiat).
+    """
+    knowledge = list(knowledge or [])
+    history = list(history or [])
+    trimmed = {"history_turns": 0, "knowledge_chunks": 0, "guest_chars": 0}
+
+    def assemble(message):
+        system = system_prompt
+        if knowledge and knowledge_prompt is not None:
+            system += "\n\n" + knowledge_prompt(knowledge)
+        return [{"role": "system", "content": system}] + history + [{"role": "user", "content": user_prompt(message)}]
+
+    messages = assemble(guest_message)
+    while count_tokens(messages) > budget and history:
+        history.pop(0)
+        trimmed["history_turns"] += 1
+        messages = assemble(guest_message)
+    while count_tokens(messages) > budget and knowledge:
+        knowledge.pop()
+        trimmed["knowledge_chunks"] += 1
+        messages = assemble(guest_message)
+
+    excess = count_tokens(messages) - budget
+    if excess > 0 and len(guest_message) > min_guest_chars:
+        # Estimarea folosește ~4 caractere per token
+        keep = max(min_guest_chars, len(guest_message) - excess * 4)
+        trimmed["guest_chars"] = len(guest_message) - keep
+        messages = assemble(truncate_message(guest_message, keep))
+
+    return messages, trimmed
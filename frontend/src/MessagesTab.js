@@ -20,6 +20,9 @@ import {
   Grid
 } from "@mui/material";
 
+// Numărul de mesaje încărcate la o cerere (GET /messages folosește paginare cu cursor)
+const MESSAGES_PAGE_SIZE = 100;
+
 export default function MessagesTab() {
   const { t } = useTranslation();
   const [hotels, setHotels] = useState([]);
@@ -29,6 +32,11 @@ export default function MessagesTab() {
   const [startDate, setStartDate] = useState("");
   const [endDate, setEndDate] = useState("");
   const [messages, setMessages] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  // Filtrele cu care s-a încărcat prima pagină: cursorul este valabil doar pentru ele
+  const [loadedParams, setLoadedParams] = useState(null);
+  const [totalMessages, setTotalMessages] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [stats, setStats] = useState([]);
   const [messageTypeFilter, setMessageTypeFilter] = useState("all");
   const [snackbar, setSnackbar] = useState({ open: false, message: "", severity: "success" });
@@ -69,27 +77,33 @@ export default function MessagesTab() {
       setRooms([]);
     }
   };
+  // Filtrele curente pentru GET /messages
+  const messageParams = () => ({
+    hotel_id: selectedHotel,
+    // If "all" is selected, don't send room_id parameter to get all rooms
+    room_id: selectedRoom === "all" ? undefined : selectedRoom,
+    start_date: startDate || undefined,
+    end_date: endDate || undefined,
+    limit: MESSAGES_PAGE_SIZE
+  });
+
   const fetchMessages = async () => {
     try {
-      // If "all" is selected, don't send room_id parameter to get all rooms
-      const params = { 
-        hotel_id: selectedHotel, 
-        room_id: selectedRoom === "all" ? undefined : selectedRoom, 
-        start_date: startDate, 
-        end_date: endDate 
-      };
-      
       // If "all" is selected, also fetch stats to show total count
       if (selectedRoom === "all") {
         fetchStats();
       }
       
-      const res = await getMessages(params);
-      // API-ul returnează direct array-ul, nu încapsulat în data
-      setMessages(res || []);
+      // Prima pagină cere și numărul total de mesaje
+      const params = messageParams();
+      const res = await getMessages({ ...params, include_total: true });
+      setMessages(res?.items || []);
+      setNextCursor(res?.next_cursor || null);
+      setLoadedParams(params);
+      setTotalMessages(res?.total || 0);
       setSnackbar({ 
         open: true, 
-        message: t('messages.messagesFound', { count: res?.length || 0 }),
+        message: t('messages.messagesFound', { count: res?.total || 0 }),
         severity: "success" 
       });
     } catch (error) {
@@ -100,6 +114,30 @@ export default function MessagesTab() {
         severity: "error" 
       });
       setMessages([]);
+      setNextCursor(null);
+      setLoadedParams(null);
+      setTotalMessages(0);
+    }
+  };
+
+  // Pagina următoare (paginare cu cursor) se adaugă la mesajele deja afișate
+  const fetchMoreMessages = async () => {
+    if (!nextCursor || !loadedParams) return;
+    setLoadingMore(true);
+    try {
+      // Aceleași filtre ca prima pagină, chiar dacă între timp câmpurile au fost modificate
+      const res = await getMessages({ ...loadedParams, cursor: nextCursor });
+      setMessages(prev => [...prev, ...(res?.items || [])]);
+      setNextCursor(res?.next_cursor || null);
+    } catch (error) {
+      console.error("Eroare la încărcarea mesajelor:", error);
+      setSnackbar({ 
+        open: true, 
+        message: `${t('common.error')}: ${t('messages.loadError')} ${error.message}`,
+        severity: "error" 
+      });
+    } finally {
+      setLoadingMore(false);
     }
   };
   
@@ -246,7 +284,7 @@ export default function MessagesTab() {
           {t('messages.messagesTitle')} 
           {filteredMessages.length > 0 && (
             <Chip 
-              label={filteredMessages.length} 
+              label={totalMessages > messages.length ? `${filteredMessages.length} / ${totalMessages}` : filteredMessages.length} 
               size="small" 
               color="primary" 
               sx={{ ml: 1 }} 
@@ -340,6 +378,14 @@ export default function MessagesTab() {
             );
           })
         )}
+
+        {nextCursor && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+            <Button variant="outlined" onClick={fetchMoreMessages} disabled={loadingMore}>
+              {t('messages.loadMore')}
+            </Button>
+          </Box>
+        )}
       </Box>
       <Paper sx={{ p: 2 }}>
         <Typography variant="h6" sx={{ mb: 2 }}>{t('messages.statsTitle')}</Typography>